@@ -1,73 +1,248 @@
-from flask import Flask, render_template, request, jsonify
+import atexit
+import io
+import json
+import os
+import tempfile
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context, url_for
 from logic import SARF_Logic
+from metrics import REGISTRY, SlowRequestProfiler
+from persistence import ChangeLog
 
 app = Flask(__name__)
-logic = SARF_Logic()
-logic.load_data('data/roots.txt', 'data/schemes.txt')
+# Recherche approchée aussi dans le trie des dérivés : contrôle de l'automate, construit à la demande
+# (mémoire en racines x schèmes)
+FUZZY_DERIVATIVES = os.environ.get('SARF_FUZZY_DERIVATIVES', '0') == '1'
+# Fréquences des dérivés en mémoire bornée : capacité du résumé global et de chaque résumé par racine
+logic = SARF_Logic(cache_size=int(os.environ.get('SARF_CACHE_SIZE', 4096)),
+                   freq_capacity=int(os.environ.get('SARF_TOPK_CAPACITY', 1024)),
+                   root_freq_capacity=int(os.environ.get('SARF_TOPK_ROOT_CAPACITY', 16)))
+
+# Mesures exposées sur /metrics (SARF_METRICS=0 pour les couper)
+REGISTRY.enabled = os.environ.get('SARF_METRICS', '1') == '1'
+REGISTRY.gauge('sarf_avl_height', "Hauteur de l'arbre AVL", lambda: logic.get_height(logic.root_tree))
+REGISTRY.gauge('sarf_roots', "Nombre de racines", lambda: len(logic.root_index))
+REGISTRY.gauge('sarf_schemes', "Nombre de schèmes", lambda: len(logic.schemes))
+# SARF_PROFILE_RATE=0.01 : profile 1 % des requêtes et garde les plus lentes (/metrics/slowest)
+profile_rate = float(os.environ.get('SARF_PROFILE_RATE', 0))
+profiler = SlowRequestProfiler(profile_rate, keep=int(os.environ.get('SARF_PROFILE_KEEP', 10))) if profile_rate else None
+
+# Persistance différée : les modifications vont dans un journal vidé en arrière-plan.
+# SARF_SHARED_LOG=1 : plusieurs processus (workers) partagent le journal et s'échangent leurs modifications.
+changelog = ChangeLog(logic, 'data/changes.log',
+                      batch_size=int(os.environ.get('SARF_FLUSH_BATCH', 256)),
+                      fsync_interval=float(os.environ.get('SARF_FSYNC_INTERVAL', 1.0)),
+                      compact_every=int(os.environ.get('SARF_COMPACT_EVERY', 10_000)),
+                      shared=os.environ.get('SARF_SHARED_LOG') == '1')
+with changelog.lock:
+    # Sous verrou : aucune compaction d'un autre processus entre la lecture des fichiers et celle du journal
+    # L'instantané binaire data/lexicon.snap (flask --app app save-snapshot) est utilisé s'il est à jour
+    logic.load_data('data/roots.txt', 'data/schemes.txt', 'data/lexicon.snap', 'data/frequencies.json')
+    changelog.replay()
+logic.attach_store(changelog.start())
+atexit.register(changelog.close)
+
+@app.before_request
+def start_request():
+    if REGISTRY.enabled or profiler: g.start = time.perf_counter()
+    if profiler: g.profile = profiler.start()
+
+@app.after_request
+def record_request(response):
+    if 'start' in g:
+        duration = time.perf_counter() - g.start
+        endpoint = request.url_rule.rule if request.url_rule else 'inconnue'
+        REGISTRY.observe('sarf_request_duration_seconds', duration, endpoint=endpoint, method=request.method)
+        REGISTRY.inc('sarf_responses_total', endpoint=endpoint, status=response.status_code)
+        profile = g.pop('profile', None)
+        if profile: profiler.stop(profile, duration, f"{request.method} {request.full_path} -> {response.status_code}")
+    return response
+
+@app.teardown_request
+def release_profile(exc):
+    # Requête interrompue par une exception : after_request n'a pas été appelé
+    profile = g.pop('profile', None)
+    if profile: profiler.stop(profile, time.perf_counter() - g.start, f"{request.method} {request.full_path} -> {exc!r}")
+
+@app.before_request
+def sync_changes():
+    # Modifications faites par les autres processus depuis la dernière requête
+    if changelog.shared: changelog.sync()
 
 @app.route('/')
 def home(): 
     return render_template('index.html')
 
+def roots_query(default_limit):
+    """Paramètres de /view_roots : bornes [lo, hi) (prefix, ou from/to) et position (offset, ou page de limit racines)."""
+    prefix = logic.strip_tashkeel(request.args.get('prefix', '').strip())
+    if prefix: lo, hi = logic.prefix_range(prefix)
+    else: lo, hi = request.args.get('from') or None, request.args.get('to') or None
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is not None: limit = max(1, min(limit, 1000))
+    page = max(1, request.args.get('page', 1, type=int))
+    offset = max(0, request.args.get('offset', (page - 1) * (limit or 0), type=int))
+    return prefix, lo, hi, offset, limit
+
+# Une page à la fois : rang et sélection en O(log n) grâce aux tailles des sous-arbres
 @app.route('/view_roots')
 def view_roots():
-    data = logic.get_all_roots_data(logic.root_tree, [])
-    return render_template('view_roots.html', roots=data)
+    prefix, lo, hi, offset, limit = roots_query(100)
+    page = logic.roots_page(offset, limit, lo, hi)
+    args = {k: v for k, v in request.args.items() if k not in ('page', 'offset')}
+    prev_url = url_for('view_roots', **args, offset=max(0, offset - limit)) if offset > 0 else None
+    next_url = url_for('view_roots', **args, offset=offset + limit) if offset + limit < page['total'] else None
+    return render_template('view_roots.html', roots=page['roots'], total=page['total'], offset=offset,
+                           prefix=prefix, prev_url=prev_url, next_url=next_url)
+
+# Variante JSON diffusée au fil de l'eau (sans limit : toutes les racines de l'intervalle)
+@app.route('/view_roots/json')
+def view_roots_json():
+    _, lo, hi, offset, limit = roots_query(None)
+    total = logic.count_range(lo, hi)
+
+    def generate():
+        yield f'{{"total": {total}, "offset": {offset}, "roots": ['
+        for i, row in enumerate(logic.iter_roots(lo, hi, offset, limit)):
+            yield (', ' if i else '') + json.dumps(row, ensure_ascii=False)
+        yield ']}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/view_schemes')
 def view_schemes():
     s_list = [{"name": k, "cat": v["cat"]} for k, v in logic.schemes.items()]
     return render_template('view_schemes.html', schemes=s_list)
 
-# Route améliorée pour utiliser populate_derivatives (Génération massive)
+# Génération de tous les dérivés d'une racine
 @app.route('/generate_all', methods=['POST'])
 def generate_all():
     root = request.json.get('root')
-    if not logic.search_root(logic.root_tree, root):
+    # On génère (moteur NumPy si disponible) sans rien stocker : seules les vérifications sont comptées
+    pairs = logic.generate_derivatives(root)
+    if pairs is None:
         return jsonify({"error": "الجذر غير موجود في قاعدة البيانات"}), 404
     
-    # On génère et on stocke dans l'arbre AVL
-    logic.populate_derivatives(root)
-    
     # On renvoie la liste pour l'affichage immédiat
-    res = [{"scheme": s, "word": logic.apply_scheme(root, s)} for s in logic.schemes]
+    res = [{"scheme": s, "word": w} for s, w in pairs]
     return jsonify({"results": res})
 
+# Génération en masse : plusieurs racines (ou toutes) x tous les schèmes, en flux NDJSON
+@app.route('/generate_batch', methods=['POST'])
+def generate_batch():
+    data = request.json or {}
+    roots = data.get('roots')
+    if roots is None and not data.get('all'):
+        return jsonify({"error": "يرجى إرسال قائمة الجذور أو all"}), 400
+    return Response(logic.generate_batch(roots), mimetype='application/x-ndjson')
+
 @app.route('/verify', methods=['POST'])
 def verify():
     word, root = request.json.get('word'), request.json.get('root')
-    ok, scheme = logic.verify_morphology(word, root)
-    if ok: 
-        return jsonify({"valid": True, "message": f"تَمَّ التحقق بنجاح! الوزن: {scheme}"})
-    return jsonify({"valid": False, "message": "هذه الكلمة لا تنتمي لهذا الجذر وفق الأوزان المتاحة"})
+    # Tous les schèmes correspondants, en une seule lecture du mot
+    schemes = logic.verify_schemes(word, root)
+    if schemes: logic.record_derivative(root, word)
+    return jsonify(verify_result(word, root, schemes))
+
+def verify_result(word, root, schemes):
+    """Corps de /verify une fois les schèmes connus et le dérivé compté (partagé avec les lots de asgi.py)."""
+    if schemes:
+        return {"valid": True, "schemes": schemes, "message": f"تَمَّ التحقق بنجاح! الوزن: {'، '.join(schemes)}"}
+    return {"valid": False, "message": "هذه الكلمة لا تنتمي لهذا الجذر وفق الأوزان المتاحة"}
 
 @app.route('/identify', methods=['POST'])
 def identify():
+    # {"words": [...]} : analyse groupée (un verrou, chaque mot distinct analysé une fois), une liste de résultats par mot
+    if 'words' in request.json:
+        words = request.json['words']
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            return jsonify({"error": "الكلمات يجب أن تكون قائمة نصوص"}), 400
+        return jsonify({"results": logic.identify_batch(words)})
     word = request.json.get('word')
-    res = logic.identify_word(word)
-    if not res: 
-        return jsonify({"error": "لم يتم العثور على أصل لهذا المشتق"}), 404
-    return jsonify({"results": res})
+    body, status = identify_result(word, logic.identify_word(word), request.json)
+    return jsonify(body), status
+
+def identify_result(word, res, data):
+    """(corps, code) de /identify une fois les analyses exactes connues (partagé avec les lots de asgi.py)."""
+    if not res:
+        # Pas d'analyse exacte : analyses les plus proches (faute de frappe, lettre oubliée) ; "max_distance"
+        # entier, ramené entre 0 et 2 par identify_fuzzy
+        k = data.get('max_distance', 1)
+        if not isinstance(k, int) or isinstance(k, bool):
+            return {"error": "المسافة القصوى يجب أن تكون عددا صحيحا"}, 400
+        res = logic.identify_fuzzy(word, k, derivatives=FUZZY_DERIVATIVES)
+        if not res:
+            return {"error": "لم يتم العثور على أصل لهذا المشتق"}, 404
+        return {"results": res, "approximate": True}, 200
+    return {"results": res}, 200
+
+# Saisie semi-automatique : ?q=préfixe&k=10, dérivés connus commençant par le préfixe
+@app.route('/suggest')
+def suggest():
+    k = max(1, min(request.args.get('k', 10, type=int), 100))
+    return jsonify({"results": logic.suggest(request.args.get('q', ''), k)})
+
+# Analyse d'un texte entier : texte brut, fichier envoyé ("file") ou JSON {"text": ...}, résultats en flux NDJSON
+@app.route('/analyze_text', methods=['POST'])
+def analyze_text():
+    if 'file' in request.files:
+        # Werkzeug ferme les fichiers envoyés à la fin de la vue : copie sur disque pour la lecture en flux
+        upload = tempfile.TemporaryFile()
+        request.files['file'].save(upload)
+        upload.seek(0)
+        source = io.TextIOWrapper(upload, encoding='utf-8', errors='replace')
+    elif request.is_json:
+        source = (request.json or {}).get('text', '')
+        # Tout autre objet serait lu comme un fichier, en plein flux
+        if not isinstance(source, str):
+            return jsonify({"error": "النص يجب أن يكون سلسلة نصية"}), 400
+    else:
+        source = io.TextIOWrapper(request.stream, encoding='utf-8', errors='replace')
+    lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in logic.analyze_stream(source))
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
 
 @app.route('/manage', methods=['POST'])
 def manage():
     data = request.json
     root, action = data.get('root', '').strip(), data.get('action')
-    if not logic.is_arabic_triple(root): 
-        return jsonify({"error": "3 أحرف عربية فقط"}), 400
+    if not logic.is_arabic_root(root): 
+        return jsonify({"error": "3 أو 4 أحرف عربية فقط"}), 400
     
     if action == 'add':
-        logic.root_tree = logic.insert_root(logic.root_tree, root)
+        logic.add_root(root)
         return jsonify({"success": f"تمت إضافة الجذر '{root}'"})
     elif action == 'delete':
-        logic.root_tree = logic.delete_root(logic.root_tree, root)
+        logic.remove_root(root)
         return jsonify({"success": f"تم حذف الجذر '{root}'"})
 
+# Import en bloc : fichier envoyé ("file"), JSON {"roots": [...]} ou texte brut, une racine par ligne
+@app.route('/roots/import', methods=['POST'])
+def import_roots():
+    if 'file' in request.files:
+        # utf-8-sig : BOM éventuel des fichiers enregistrés sous Windows
+        lines = io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig', errors='replace')
+    elif request.is_json:
+        lines = (request.json or {}).get('roots', [])
+        if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+            return jsonify({"error": "الجذور يجب أن تكون قائمة نصوص"}), 400
+    else:
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', errors='replace')
+    counts = logic.import_roots(lines)
+    return jsonify({**counts, "success": f"تمت إضافة {counts['added']} جذر ({counts['duplicates']} مكرر، {counts['invalid']} غير صالح)"})
+
+# Export en flux, au format de roots.txt (mêmes bornes que /view_roots : prefix, from/to, offset, limit)
+@app.route('/roots/export')
+def export_roots():
+    _, lo, hi, offset, limit = roots_query(None)
+    return Response(stream_with_context(logic.export_roots(lo, hi, offset, limit)), mimetype='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': 'attachment; filename=roots.txt'})
+
 # Route pour ajouter un schème dynamiquement
 @app.route('/add_scheme', methods=['POST'])
 def add_scheme():
     name = request.json.get('name')
     cat = request.json.get('category', 'عام')
+    if not logic.is_valid_scheme(name, cat):
+        return jsonify({"error": "اسم الوزن أو التصنيف غير صالح"}), 400
     if logic.add_scheme(name, cat):
         return jsonify({"success": f"تمت إضافة الوزن '{name}'"})
     return jsonify({"error": "الوزن موجود بالفعل"}), 400
@@ -86,6 +261,40 @@ def delete_scheme():
     else:
         return jsonify({"error": f"الوزن '{name}' غير موجود"}), 404
 
+# Dérivés les plus vérifiés (comptes approchés, avec leur erreur maximale)
+@app.route('/top_derivatives')
+def top_derivatives():
+    k = min(request.args.get('k', 10, type=int), 100)
+    root = request.args.get('root')
+    if root:
+        root = logic.strip_tashkeel(root.strip())
+        if root not in logic.root_index:
+            return jsonify({"error": "الجذر غير موجود في قاعدة البيانات"}), 404
+    return jsonify(logic.top_derivatives(k, root or None))
+
+# Statistiques des caches LRU (dimensionnement en production)
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(logic.cache_stats())
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# Profils des requêtes les plus lentes (échantillonnage activé par SARF_PROFILE_RATE)
+@app.route('/metrics/slowest')
+def slowest_requests():
+    if not profiler:
+        return jsonify({"error": "المحلل غير مفعل (SARF_PROFILE_RATE)"}), 404
+    return Response(profiler.dump(), mimetype='text/plain')
+
+@app.cli.command('save-snapshot')
+def save_snapshot():
+    """Écrit l'instantané binaire utilisé pour un démarrage rapide."""
+    changelog.flush()
+    logic.save_snapshot()
+    print(f"Instantané écrit : {logic.snap_path}")
+
 
 if __name__ == '__main__': 
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)
\ No newline at end of file
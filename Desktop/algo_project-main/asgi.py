@@ -0,0 +1,254 @@
+"""Frontal ASGI : regroupe en micro-lots les appels concurrents à /identify et /verify, le reste passe à Flask.
+
+Les requêtes à un seul mot reçues pendant une courte fenêtre (SARF_BATCH_WINDOW, en millisecondes) forment un
+lot : les mots identiques n'y figurent qu'une fois, et tout le lot est évalué par un seul appel de SARF_Logic
+(identify_batch / verify_batch : un verrou, une analyse par mot distinct) dans un thread, puis chaque appelant
+reçoit son résultat. Les autres routes, et les formes de requête que les lots ne couvrent pas, passent par un
+pont WSGI vers l'application Flask (corps de requête et réponse en flux).
+
+Tout se passe dans le processus, sans intermédiaire : n'importe quel serveur ASGI convient
+(uvicorn asgi:application). SARF_BATCH=0 envoie tout au pont WSGI (chemin requête par requête).
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, changelog, identify_result, logic, verify_result
+from metrics import REGISTRY
+
+
+class MicroBatcher:
+    """Regroupe les clés soumises pendant window secondes (au plus max_batch distinctes) en un appel evaluate.
+
+    evaluate(clés, appelants) reçoit des clés distinctes et le nombre d'appels de chacune, et renvoie leurs
+    résultats dans le même ordre ; il est appelé dans un thread de executor. Les appelants d'une même clé
+    partagent un seul futur.
+    """
+
+    def __init__(self, name, evaluate, executor, window=0.002, max_batch=256):
+        self.name, self.evaluate, self.executor = name, evaluate, executor
+        self.window, self.max_batch = window, max_batch
+        self.pending = {} # clé -> futur partagé par ses appelants
+        self.callers = {} # clé -> nombre d'appels en attente
+        self.timer = None
+        self.tasks = set() # Lots en cours (référence forte, cf. asyncio.create_task)
+        self.calls = self.batches = self.keys = 0
+
+    async def submit(self, key):
+        self.calls += 1
+        self.callers[key] = self.callers.get(key, 0) + 1
+        future = self.pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.pending[key] = loop.create_future()
+            if len(self.pending) >= self.max_batch: self.flush()
+            elif self.timer is None: self.timer = loop.call_later(self.window, self.flush)
+        # shield : un appelant déconnecté n'annule pas le résultat attendu par les autres
+        return await asyncio.shield(future)
+
+    def flush(self):
+        if self.timer: self.timer.cancel()
+        self.timer = None
+        batch, callers, self.pending, self.callers = self.pending, self.callers, {}, {}
+        if not batch: return
+        task = asyncio.get_running_loop().create_task(self._run(batch, callers))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch, callers):
+        keys = list(batch)
+        self.batches += 1
+        self.keys += len(keys)
+        if REGISTRY.enabled: REGISTRY.observe('sarf_batch_size', len(keys), op=self.name)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.evaluate, keys,
+                                                                   [callers[key] for key in keys])
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done(): future.set_exception(exc)
+            return
+        for key, result in zip(keys, results):
+            if not batch[key].done(): batch[key].set_result(result)
+
+
+class BatchingFrontend:
+    """Application ASGI : lots pour POST /identify et /verify (JSON à un mot), pont WSGI pour tout le reste."""
+
+    def __init__(self, wsgi_app, window=0.002, max_batch=256, threads=32, batching=True):
+        self.wsgi_app = wsgi_app
+        self.batching = batching
+        # Pont WSGI : un thread par requête en cours, comme un serveur WSGI multi-thread
+        self.wsgi_pool = ThreadPoolExecutor(threads, thread_name_prefix='sarf-wsgi')
+        # Threads réservés aux lots : jamais en file d'attente derrière les requêtes WSGI
+        self.batch_pool = ThreadPoolExecutor(4, thread_name_prefix='sarf-batch')
+        self.identify = MicroBatcher('identify', self._identify_batch, self.batch_pool, window, max_batch)
+        self.verify = MicroBatcher('verify', self._verify_batch, self.batch_pool, window, max_batch)
+
+    @staticmethod
+    def _identify_batch(words, callers):
+        # Comme sync_changes pour Flask, une fois par lot
+        if changelog.shared: changelog.sync()
+        return logic.identify_batch(words)
+
+    @staticmethod
+    def _verify_batch(pairs, callers):
+        if changelog.shared: changelog.sync()
+        # Dérivés comptés ici, sous le verrou du lot : jamais de verrou pris sur la boucle d'événements
+        return logic.verify_batch(pairs, callers)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan': return await self._lifespan(receive, send)
+        if scope['type'] != 'http': return
+        body = None
+        if self.batching and scope['method'] == 'POST' and scope['path'] in ('/identify', '/verify') \
+                and _content_type(scope) == b'application/json':
+            start = time.perf_counter()
+            body = await _read_body(receive)
+            result = await self._batched(scope['path'], body)
+            if result is not None:
+                await _send_json(send, *result)
+                if REGISTRY.enabled:
+                    REGISTRY.observe('sarf_request_duration_seconds', time.perf_counter() - start,
+                                     endpoint=scope['path'], method='POST')
+                    REGISTRY.inc('sarf_responses_total', endpoint=scope['path'], status=result[1])
+                return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.wsgi_pool, self._call_wsgi, loop, scope, receive, send, body)
+
+    async def _batched(self, path, body):
+        """(corps, code) d'une requête à un mot, ou None si sa forme relève de Flask (liste de mots, JSON invalide...)."""
+        try: data = json.loads(body)
+        except ValueError: return None
+        if not isinstance(data, dict): return None
+        if path == '/identify':
+            word = data.get('word')
+            if 'words' in data or not isinstance(word, str): return None
+            res = await self.identify.submit(word)
+            if res: return identify_result(word, res, data)
+            # Pas d'analyse exacte : repli approché, requête par requête (plus coûteux, hors des threads des lots)
+            return await asyncio.get_running_loop().run_in_executor(self.wsgi_pool, identify_result, word, res, data)
+        word, root = data.get('word'), data.get('root')
+        if not isinstance(word, str) or not isinstance(root, str): return None
+        return verify_result(word, root, await self.verify.submit((word, root))), 200
+
+    def _call_wsgi(self, loop, scope, receive, send, body):
+        """Exécute l'application WSGI dans un thread ; corps lu et réponse envoyée par la boucle, au fil de l'eau."""
+        call = lambda coro: asyncio.run_coroutine_threadsafe(coro, loop).result()
+        environ = _environ(scope, io.BufferedReader(_RequestBody(receive, call, body)))
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'): raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+            return write
+
+        def write(data, more=True):
+            # En-têtes envoyés au premier morceau : start_response peut encore être rappelé avant
+            if not response.get('sent'):
+                call(send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']}))
+                response['sent'] = True
+            if data or not more: call(send({'type': 'http.response.body', 'body': data, 'more_body': more}))
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result: write(chunk)
+            write(b'', more=False)
+        finally:
+            if hasattr(result, 'close'): result.close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for batcher in (self.identify, self.verify): batcher.flush()
+                # Vide le journal (aussi fait par atexit, sans effet la seconde fois)
+                await asyncio.get_running_loop().run_in_executor(None, changelog.close)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+class _RequestBody(io.RawIOBase):
+    """wsgi.input : corps lu depuis receive à la demande du thread WSGI (ou déjà lu, body)."""
+
+    def __init__(self, receive, call, body=None):
+        self.receive, self.call = receive, call
+        self.buffer = bytearray(body or b'')
+        self.more = body is None
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.buffer and self.more:
+            message = self.call(self.receive())
+            if message['type'] == 'http.disconnect': self.more = False
+            else:
+                self.buffer += message.get('body', b'')
+                self.more = message.get('more_body', False)
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        del self.buffer[:n]
+        return n
+
+
+def _environ(scope, body):
+    server, client = scope.get('server') or ('localhost', 80), scope.get('client') or ('', 0)
+    root_path, path = scope.get('root_path', ''), scope['path']
+    if root_path and path.startswith(root_path): path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI : chemins en octets UTF-8 décodés en latin-1
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0], 'SERVER_PORT': str(server[1]), 'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body, 'wsgi.errors': sys.stderr,
+        # Corps lu jusqu'à la fin du flux, même sans Content-Length (envoi par morceaux)
+        'wsgi.input_terminated': True,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'): key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _content_type(scope):
+    for name, value in scope['headers']:
+        if name == b'content-type': return value.split(b';')[0].strip().lower()
+    return b''
+
+
+async def _read_body(receive):
+    body, more = bytearray(), True
+    while more:
+        message = await receive()
+        if message['type'] == 'http.disconnect': break
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return bytes(body)
+
+
+async def _send_json(send, body, status):
+    # Même réponse que jsonify (encodage, séparateurs, en-têtes)
+    response = flask_app.json.response(body)
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]})
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+application = BatchingFrontend(flask_app, window=float(os.environ.get('SARF_BATCH_WINDOW', 2)) / 1000,
+                               max_batch=int(os.environ.get('SARF_BATCH_MAX', 256)),
+                               threads=int(os.environ.get('SARF_ASGI_THREADS', 32)),
+                               batching=os.environ.get('SARF_BATCH', '1') == '1')
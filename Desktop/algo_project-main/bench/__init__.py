@@ -0,0 +1,7 @@
+"""Outils de mesure des performances du moteur SARF.
+
+- lexicon : génération de lexiques synthétiques (racines aléatoires ou triées, centaines à milliers de schèmes)
+- run : chronométrage des opérations de SARF_Logic et des routes Flask, résultats en JSON comparables
+
+Usage : python -m bench.run --out resultats.json [--project ../algo-main] [--compare reference.json]
+"""
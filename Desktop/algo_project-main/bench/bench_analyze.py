@@ -0,0 +1,71 @@
+"""Débit de analyze_stream (mots/seconde) sur un corpus synthétique de plusieurs mégaoctets.
+
+Usage : python bench/bench_analyze.py [--mb 8] [--vocab 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from logic import SARF_Logic
+
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def write_corpus(path, logic, mb, vocab_size, seed=0):
+    """Mélange de dérivés valides et de mots aléatoires, avec ponctuation, jusqu'à mb mégaoctets."""
+    rnd = random.Random(seed)
+    roots = [d['root'] for d in logic.get_all_roots_data(logic.root_tree, [])]
+    vocab = []
+    for _ in range(vocab_size):
+        if rnd.random() < 0.5: vocab.append(logic.apply_scheme(rnd.choice(roots), rnd.choice(list(logic.schemes))))
+        else: vocab.append(''.join(rnd.choice(LETTERS) for _ in range(rnd.randint(2, 7))))
+    words, size, limit = 0, 0, mb * 2**20
+    with open(path, 'w', encoding='utf-8') as f:
+        while size < limit:
+            line = ' '.join(rnd.choice(vocab) for _ in range(12)) + '، ' + rnd.choice(vocab) + '.\n'
+            f.write(line)
+            size += len(line.encode('utf-8'))
+            words += 13
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=8)
+    parser.add_argument('--vocab', type=int, default=20_000)
+    args = parser.parse_args()
+
+    logic = SARF_Logic()
+    rnd = random.Random(1)
+    logic.bulk_build(sorted({''.join(rnd.choice(LETTERS) for _ in range(3)) for _ in range(5000)}))
+    for s_name in ['فعل', 'فاعل', 'مفعول', 'تفعيل', 'مفعل', 'يفعل', 'فعال', 'فعيل', 'افتعال', 'استفعال']:
+        logic.schemes[s_name] = {"cat": "عام"}
+        logic._set_scheme(s_name, "عام")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'corpus.txt')
+        words = write_corpus(path, logic, args.mb, args.vocab)
+
+        t0 = time.perf_counter()
+        with open(path, encoding='utf-8') as f:
+            distinct = sum(1 for _ in logic.analyze_stream(f))
+        elapsed = time.perf_counter() - t0
+
+        # Deuxième passage sous tracemalloc (plus lent) pour vérifier que la mémoire reste plate
+        tracemalloc.start()
+        with open(path, encoding='utf-8') as f:
+            for _ in logic.analyze_stream(f): pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{args.mb} Mo, {words} mots ({distinct} distincts) | {elapsed:.2f}s | {words / elapsed:,.0f} mots/s"
+          f" | pic mémoire {peak / 2**20:.1f} Mo")
+
+
+if __name__ == '__main__':
+    main()
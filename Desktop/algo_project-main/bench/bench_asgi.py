@@ -0,0 +1,97 @@
+"""Latence de queue sous charge concurrente : frontal ASGI en micro-lots vs chemin requête par requête (pont WSGI).
+
+Les clients sont simulés dans le processus (appels ASGI directs, sans réseau) : chacun envoie ses requêtes
+/identify et /verify à un mot l'une après l'autre, tous en même temps. Un petit vocabulaire (--distinct)
+reproduit les rafales de mots répétés.
+
+Usage : python bench/bench_asgi.py [--clients 64] [--requests 50] [--distinct 200] [--window 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench.lexicon import make_roots, make_schemes, write_lexicon
+
+
+async def request(frontend, path, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+             'path': path, 'root_path': '', 'query_string': b'', 'server': ('bench', 80), 'client': ('127.0.0.1', 0),
+             'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = []
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start': status.append(message['status'])
+
+    t0 = time.perf_counter()
+    await frontend(scope, receive, send)
+    return time.perf_counter() - t0, status[0]
+
+
+async def load(frontend, calls, clients):
+    async def client(i):
+        return [await request(frontend, path, payload) for path, payload in calls[i::clients]]
+    t0 = time.perf_counter()
+    results = [r for rs in await asyncio.gather(*(client(i) for i in range(clients))) for r in rs]
+    return results, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--roots', type=int, default=5000)
+    parser.add_argument('--schemes', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=64, help="clients simultanés")
+    parser.add_argument('--requests', type=int, default=50, help="requêtes par client")
+    parser.add_argument('--distinct', type=int, default=200, help="mots distincts dans la charge")
+    parser.add_argument('--window', type=float, default=2, help="fenêtre de regroupement (ms)")
+    args = parser.parse_args()
+
+    roots = make_roots(args.roots)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_lexicon(os.path.join(tmp, 'data'), roots, make_schemes(args.schemes))
+        # app.py charge data/ relativement au dossier courant à l'import
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            import asgi
+            rnd = random.Random(0)
+            names = list(asgi.logic.schemes)
+            pairs = [(r, asgi.logic.apply_scheme(r, rnd.choice(names))) for r in rnd.sample(roots, args.distinct)]
+            calls = []
+            for _ in range(args.clients * args.requests):
+                root, word = rnd.choice(pairs)
+                if rnd.random() < 0.5: calls.append(('/identify', {"word": word}))
+                else: calls.append(('/verify', {"word": word, "root": root}))
+
+            for label, batching in (('requête par requête', False), ('micro-lots', True)):
+                frontend = asgi.BatchingFrontend(asgi.flask_app, window=args.window / 1000, batching=batching)
+                results, elapsed = asyncio.run(load(frontend, calls, args.clients))
+                lat = sorted(t for t, _ in results)
+                pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+                errors = sum(status != 200 for _, status in results)
+                line = (f"{label:<20} {len(lat) / elapsed:8.0f} req/s | p50 {pct(0.50):7.2f}ms | p95 {pct(0.95):7.2f}ms"
+                        f" | p99 {pct(0.99):7.2f}ms | max {lat[-1] * 1000:7.2f}ms | erreurs {errors}")
+                batches = frontend.identify.batches + frontend.verify.batches
+                if batches:
+                    keys = frontend.identify.keys + frontend.verify.keys
+                    line += f" | {batches} lots, {keys / batches:.1f} clés/lot"
+                print(line)
+                frontend.wsgi_pool.shutdown()
+                frontend.batch_pool.shutdown()
+            asgi.changelog.close()
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""import_roots (fusion triée + bulk_build) vs boucle add_root (une insertion et une ligne de journal par racine).
+
+Usage : python bench/bench_import.py [--roots 10000] [--new 10000] [--schemes 50] [--trie]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench.lexicon import make_roots, make_schemes, write_lexicon
+from logic import SARF_Logic
+from persistence import ChangeLog
+
+
+def loaded(tmp, roots, schemes, trie):
+    logic = SARF_Logic()
+    logic.load_data(*write_lexicon(tmp, roots, schemes))
+    # Journal réel, comme dans app.py (sans journal, chaque add_root réécrit tout roots.txt)
+    store = ChangeLog(logic, os.path.join(tmp, 'changes.log'), compact_every=10 ** 9)
+    store.replay()
+    logic.attach_store(store.start())
+    if trie: logic._ensure_trie()
+    return logic, store
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--roots', type=int, default=10_000)
+    parser.add_argument('--new', type=int, default=10_000, help="racines importées absentes du lexique")
+    parser.add_argument('--schemes', type=int, default=50)
+    parser.add_argument('--trie', action='store_true', help="trie des dérivés déjà construit (tenu à jour)")
+    args = parser.parse_args()
+
+    pool = make_roots(args.roots + args.new)
+    roots, new = pool[:args.roots], pool[args.roots:]
+    schemes = make_schemes(args.schemes)
+    # Fichier importé : nouvelles racines, racines déjà connues et une ligne invalide
+    lines = new + roots[:args.new // 10] + ['abc']
+
+    timings = {}
+    for label in ('boucle add_root', 'import_roots'):
+        with tempfile.TemporaryDirectory() as tmp:
+            logic, store = loaded(tmp, roots, schemes, args.trie)
+            t0 = time.perf_counter()
+            if label == 'import_roots': counts = logic.import_roots(lines)
+            else:
+                for r in new: logic.add_root(r)
+            store.flush()
+            timings[label] = time.perf_counter() - t0
+            store.close()
+            print(f"{label:<16} {timings[label]:7.3f}s | {len(logic.root_index)} racines"
+                  f" | hauteur {logic.get_height(logic.root_tree)}")
+    print(f"import : {counts} | x{timings['boucle add_root'] / timings['import_roots']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
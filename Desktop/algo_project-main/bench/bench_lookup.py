@@ -0,0 +1,60 @@
+"""Micro-benchmark : recherche exacte dans l'arbre AVL (search_root) vs l'index de hachage (find_root).
+
+Usage : python bench/bench_lookup.py [--sizes 10000 100000 1000000] [--queries 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from logic import SARF_Logic
+
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def synthetic_keys(n, seed=0):
+    """Clés uniques de 5 lettres (au-delà des ~22k racines trilitères possibles)."""
+    rnd = random.Random(seed)
+    base = len(LETTERS)
+    keys = []
+    for code in rnd.sample(range(base ** 5), n):
+        word = ""
+        for _ in range(5):
+            code, r = divmod(code, base)
+            word += LETTERS[r]
+        keys.append(word)
+    return keys
+
+
+def bench(n, queries):
+    logic = SARF_Logic()
+    keys = synthetic_keys(n)
+    t0 = time.perf_counter()
+    for k in keys: logic.root_tree = logic.insert_root(logic.root_tree, k)
+    build = time.perf_counter() - t0
+
+    rnd = random.Random(1)
+    # Moitié de clés présentes, moitié absentes
+    probe = [rnd.choice(keys) for _ in range(queries // 2)] + synthetic_keys(queries // 2, seed=2)
+    rnd.shuffle(probe)
+
+    t0 = time.perf_counter()
+    for k in probe: logic.search_root(logic.root_tree, k)
+    tree_t = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for k in probe: logic.find_root(k)
+    hash_t = time.perf_counter() - t0
+
+    print(f"{n:>9} racines | construction {build:7.2f}s | search_root {tree_t / queries * 1e9:8.0f} ns/op"
+          f" | find_root {hash_t / queries * 1e9:6.0f} ns/op | x{tree_t / hash_t:.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=100_000)
+    args = parser.parse_args()
+    for n in args.sizes: bench(n, args.queries)
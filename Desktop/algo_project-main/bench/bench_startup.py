@@ -0,0 +1,67 @@
+"""Mesure le temps de load_data et la mémoire occupée par l'arbre pour un fichier de racines.
+
+Usage : python bench/bench_startup.py [--roots 100000] [--sorted] [--snapshot]
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from logic import SARF_Logic
+
+# Toutes les lettres acceptées par is_arabic_root (U+0621..U+064A)
+ALPHABET = [chr(c) for c in range(0x0621, 0x064B)]
+
+
+def write_roots_file(path, n, sort, seed=0):
+    rnd = random.Random(seed)
+    roots = [''.join(rnd.choice(ALPHABET) for _ in range(3)) for _ in range(n)]
+    if sort: roots.sort()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(roots) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--roots', type=int, default=100_000)
+    parser.add_argument('--sorted', action='store_true', help="fichier déjà trié")
+    parser.add_argument('--snapshot', action='store_true', help="charger depuis un instantané binaire")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        r_path = os.path.join(tmp, 'roots.txt')
+        write_roots_file(r_path, args.roots, args.sorted)
+
+        s_path = os.path.join(tmp, 'schemes.txt')
+        snap_path = None
+        if args.snapshot:
+            snap_path = os.path.join(tmp, 'lexicon.snap')
+            writer = SARF_Logic()
+            writer.load_data(r_path, s_path)
+            writer.save_snapshot(snap_path)
+
+        logic = SARF_Logic()
+        t0 = time.perf_counter()
+        logic.load_data(r_path, s_path, snap_path)
+        elapsed = time.perf_counter() - t0
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        # Deuxième chargement sous tracemalloc (plus lent) pour mesurer la mémoire retenue
+        tracemalloc.start()
+        traced = SARF_Logic()
+        traced.load_data(r_path, s_path, snap_path)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    count = len(logic.get_all_roots_data(logic.root_tree, []))
+    print(f"{args.roots} lignes -> {count} racines | load_data {elapsed:.3f}s"
+          f" | mémoire retenue {current / 2**20:.1f} Mo (pic {peak / 2**20:.1f} Mo) | RSS max {rss:.0f} Mo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Moteur NumPy vs boucle apply_scheme, identify_batch vs boucle identify_word : génération de tous les dérivés et analyse groupée.
+
+Usage : python bench/bench_vectorized.py [--roots 5000] [--schemes 500] [--words 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench.lexicon import make_roots, make_schemes, write_lexicon
+from logic import SARF_Logic
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--roots', type=int, default=5000)
+    parser.add_argument('--schemes', type=int, default=500)
+    parser.add_argument('--words', type=int, default=50_000)
+    args = parser.parse_args()
+
+    roots = make_roots(args.roots)
+    with tempfile.TemporaryDirectory() as tmp:
+        logic = SARF_Logic()
+        logic.load_data(*write_lexicon(tmp, roots, make_schemes(args.schemes)))
+    names = list(logic.schemes)
+
+    t0 = time.perf_counter()
+    loop = [[(s, logic._apply_scheme(r, s)) for s in names] for r in roots]
+    loop_t = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vec = logic.derivatives(roots)
+    vec_t = time.perf_counter() - t0
+    assert vec == loop
+    print(f"dérivés  {len(roots) * len(names):>9} mots | boucle {loop_t:6.2f}s | NumPy {vec_t:6.2f}s | x{loop_t / vec_t:.1f}")
+
+    rnd = random.Random(1)
+    words = [logic.apply_scheme(rnd.choice(roots), rnd.choice(names)) for _ in range(args.words)]
+    t0 = time.perf_counter()
+    loop = [logic.identify_word(w) for w in words]
+    loop_t = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vec = logic.identify_batch(words)
+    vec_t = time.perf_counter() - t0
+    assert vec == loop
+    print(f"analyse  {len(words):>9} mots | boucle {loop_t:6.2f}s | lots  {vec_t:6.2f}s | x{loop_t / vec_t:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Lexiques synthétiques pour les benchmarks : racines trilitères et schèmes au format de data/."""
+import os
+import random
+
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+# Lettres ajoutées autour des radicales (jamais ف, ع ou ل, qui désignent les positions)
+AFFIXES = 'اتمنسيوه'
+
+
+def make_roots(n, sort=False, seed=0):
+    """n racines distinctes, dans un ordre aléatoire ou triées (le pire cas d'un arbre sans rééquilibrage)."""
+    base = len(LETTERS)
+    if n > base ** 3: raise ValueError(f"au plus {base ** 3} racines trilitères distinctes")
+    roots = []
+    for code in random.Random(seed).sample(range(base ** 3), n):
+        a, rest = divmod(code, base * base)
+        b, c = divmod(rest, base)
+        roots.append(LETTERS[a] + LETTERS[b] + LETTERS[c])
+    if sort: roots.sort()
+    return roots
+
+
+def make_schemes(n, seed=0):
+    """n schèmes distincts : préfixe + ف + infixe + ع + infixe + ل + suffixe."""
+    rnd = random.Random(seed)
+    affix = lambda k: ''.join(rnd.choice(AFFIXES) for _ in range(rnd.randint(0, k)))
+    schemes = {}
+    while len(schemes) < n:
+        name = affix(2) + 'ف' + affix(1) + 'ع' + affix(1) + 'ل' + affix(2)
+        schemes.setdefault(name, rnd.choice(('verbe', 'nom')))
+    return list(schemes.items())
+
+
+def write_lexicon(directory, roots, schemes):
+    """Écrit roots.txt et schemes.txt dans directory et renvoie leurs chemins."""
+    os.makedirs(directory, exist_ok=True)
+    r_path, s_path = os.path.join(directory, 'roots.txt'), os.path.join(directory, 'schemes.txt')
+    with open(r_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(r + '\n' for r in roots))
+    with open(s_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(f"{name},{cat}\n" for name, cat in schemes))
+    return r_path, s_path
@@ -0,0 +1,192 @@
+"""Benchmark du moteur SARF : opérations de SARF_Logic et routes Flask (client de test), résultats en JSON.
+
+Le projet mesuré est choisi par --project (par défaut celui-ci), ce qui permet de comparer avec ../algo-main
+dont l'arbre n'est jamais rééquilibré (--sorted montre le cas dégénéré).
+
+Usage :
+  python -m bench.run --out nouveau.json
+  python -m bench.run --project ../algo-main --sorted --out ancien.json
+  python -m bench.run --sorted --compare ancien.json [--threshold 1.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from bench.lexicon import LETTERS, make_roots, make_schemes, write_lexicon
+
+
+def summarize(samples_ns):
+    s = sorted(samples_ns)
+    pct = lambda p: s[min(len(s) - 1, int(p * len(s)))] / 1e3
+    return {"calls": len(s), "total_s": sum(s) / 1e9, "mean_us": sum(s) / len(s) / 1e3,
+            "p50_us": pct(0.50), "p95_us": pct(0.95), "p99_us": pct(0.99), "max_us": s[-1] / 1e3}
+
+
+def timed(fn, inputs):
+    """Chronomètre fn appel par appel ; une exception arrête la mesure et est rapportée."""
+    samples = []
+    try:
+        for args in inputs:
+            t0 = time.perf_counter_ns()
+            fn(*args)
+            samples.append(time.perf_counter_ns() - t0)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "calls": len(samples)}
+    return summarize(samples)
+
+
+def bench_logic(SARF_Logic, r_path, s_path, roots, schemes, extra, args):
+    rnd = random.Random(args.seed + 1)
+    names = [name for name, _ in schemes]
+    res, holder = {}, {}
+
+    def load():
+        holder['logic'] = SARF_Logic()
+        holder['logic'].load_data(r_path, s_path)
+    res['load_data'] = timed(load, [()] * args.repeat)
+    logic = holder.get('logic')
+    if logic is None: return res
+
+    probe = [(rnd.choice(roots if i % 2 else extra),) for i in range(args.queries)]
+    res['search_root'] = timed(lambda k: logic.search_root(logic.root_tree, k), probe)
+
+    fresh = [(k,) for k in extra[:args.queries]]
+    def insert(k): logic.root_tree = logic.insert_root(logic.root_tree, k)
+    def delete(k): logic.root_tree = logic.delete_root(logic.root_tree, k)
+    res['insert_root'] = timed(insert, fresh)
+    res['delete_root'] = timed(delete, fresh)
+
+    pairs = [(rnd.choice(roots), rnd.choice(names)) for _ in range(args.queries)]
+    res['apply_scheme'] = timed(logic.apply_scheme, pairs)
+
+    # Moitié de mots valides pour leur racine, moitié construits sur une autre racine
+    words = [(logic.apply_scheme(r, s), r if i % 2 else rnd.choice(roots)) for i, (r, s) in enumerate(pairs)]
+    res['verify_morphology'] = timed(logic.verify_morphology, words)
+    res['identify_word'] = timed(logic.identify_word, [(w,) for w, _ in words])
+    res['get_all_roots_data'] = timed(lambda: logic.get_all_roots_data(logic.root_tree, []), [()] * args.repeat)
+    return res
+
+
+def bench_endpoints(app, roots, schemes, extra, args):
+    rnd = random.Random(args.seed + 2)
+    names = [name for name, _ in schemes]
+    client = app.test_client()
+    res = {}
+
+    def endpoint(label, calls):
+        status = {}
+        def call(method, url, body):
+            r = client.open(url, method=method, json=body)
+            r.get_data()
+            status[str(r.status_code)] = status.get(str(r.status_code), 0) + 1
+        res[label] = timed(call, calls)
+        res[label]['status'] = status
+
+    n = args.requests
+    endpoint('GET /view_roots', [('GET', '/view_roots', None)] * args.repeat)
+    endpoint('GET /view_schemes', [('GET', '/view_schemes', None)] * args.repeat)
+    endpoint('POST /generate_all', [('POST', '/generate_all', {"root": rnd.choice(roots)}) for _ in range(n)])
+    pairs = [(r, rnd.choice(names)) for r in (rnd.choice(roots) for _ in range(n))]
+    # Les mots sont construits à la main : apply_scheme n'est pas exposé par l'API
+    words = [(''.join({'ف': r[0], 'ع': r[1], 'ل': r[2]}.get(c, c) for c in s), r) for r, s in pairs]
+    endpoint('POST /verify', [('POST', '/verify', {"word": w, "root": r}) for w, r in words])
+    endpoint('POST /identify', [('POST', '/identify', {"word": w}) for w, _ in words])
+    fresh = extra[:n]
+    endpoint('POST /manage add', [('POST', '/manage', {"root": k, "action": "add"}) for k in fresh])
+    endpoint('POST /manage delete', [('POST', '/manage', {"root": k, "action": "delete"}) for k in fresh])
+    return res
+
+
+def compare(results, baseline, threshold):
+    """Affiche le rapport temps moyen / référence et renvoie les opérations plus lentes que threshold."""
+    regressions = []
+    print(f"\n{'opération':<24}{'référence':>14}{'actuel':>14}{'ratio':>9}")
+    for section in ('logic', 'endpoints'):
+        for op, cur in results[section].items():
+            ref = baseline.get(section, {}).get(op)
+            if not ref or 'mean_us' not in ref or 'mean_us' not in cur: continue
+            ratio = cur['mean_us'] / ref['mean_us']
+            flag = '  <-- régression' if ratio > threshold else ''
+            if flag: regressions.append(op)
+            print(f"{op:<24}{ref['mean_us']:>12.1f}µs{cur['mean_us']:>12.1f}µs{ratio:>8.2f}x{flag}")
+    return regressions
+
+
+def report(results):
+    for section in ('logic', 'endpoints'):
+        print(f"\n[{section}]")
+        for op, r in results[section].items():
+            if 'error' in r: print(f"{op:<24} ERREUR après {r['calls']} appels : {r['error']}")
+            else: print(f"{op:<24}{r['calls']:>7} appels | moy {r['mean_us']:10.1f}µs | p50 {r['p50_us']:10.1f}µs"
+                        f" | p95 {r['p95_us']:10.1f}µs | max {r['max_us']:10.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--project', default=os.path.dirname(HERE), help="dossier contenant logic.py et app.py")
+    parser.add_argument('--roots', type=int, default=5000)
+    parser.add_argument('--schemes', type=int, default=500)
+    parser.add_argument('--sorted', action='store_true', help="fichier de racines trié")
+    parser.add_argument('--queries', type=int, default=2000, help="appels par opération de SARF_Logic")
+    parser.add_argument('--requests', type=int, default=200, help="requêtes par route")
+    parser.add_argument('--repeat', type=int, default=3, help="répétitions des opérations globales")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-endpoints', action='store_true')
+    parser.add_argument('--out', help="fichier JSON des résultats")
+    parser.add_argument('--compare', help="résultats JSON de référence")
+    parser.add_argument('--threshold', type=float, default=1.2, help="ratio au-delà duquel on signale une régression")
+    args = parser.parse_args()
+
+    project = os.path.abspath(args.project)
+    sys.path.insert(0, project)
+    from logic import SARF_Logic
+    # L'arbre d'algo-main est récursif et dégénère en liste sur des racines triées
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * args.roots + 1000))
+
+    roots = make_roots(args.roots, args.sorted, args.seed)
+    known = set(roots)
+    pool = make_roots(min(len(known) + args.queries * 2, len(LETTERS) ** 3), seed=args.seed + 3)
+    extra = [k for k in pool if k not in known]
+    schemes = make_schemes(args.schemes, args.seed)
+
+    results = {"meta": {"project": project, "python": platform.python_version(), "platform": platform.platform(),
+                        "date": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        "params": {k: v for k, v in vars(args).items() if k not in ('out', 'compare')}}}
+    with tempfile.TemporaryDirectory() as tmp:
+        r_path, s_path = write_lexicon(os.path.join(tmp, 'data'), roots, schemes)
+        results['logic'] = bench_logic(SARF_Logic, r_path, s_path, roots, schemes, extra, args)
+        results['endpoints'] = {}
+        if not args.no_endpoints:
+            # app.py charge data/ relativement au dossier courant à l'import
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                t0 = time.perf_counter_ns()
+                import app as app_module
+                results['endpoints']['import app'] = summarize([time.perf_counter_ns() - t0])
+                app_module.app.testing = True
+                results['endpoints'].update(bench_endpoints(app_module.app, roots, schemes, extra, args))
+                # Vide le journal différé avant la suppression du dossier temporaire
+                if hasattr(app_module, 'changelog'): app_module.changelog.close()
+            finally:
+                os.chdir(cwd)
+
+    report(results)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
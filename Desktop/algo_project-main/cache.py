@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+MISSING = object()
+
+class LRUCache:
+    """Cache borné à éviction LRU, avec compteurs hits / misses / évictions pour le dimensionner en production.
+
+    Utilisable depuis plusieurs threads (un verrou court protège chaque opération).
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0: return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard_if(self, predicate):
+        """Invalide toutes les entrées dont la clé satisfait le prédicat ; renvoie leur nombre."""
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale: del self._data[k]
+            return len(stale)
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
@@ -0,0 +1,90 @@
+import threading
+from contextlib import contextmanager
+
+class RWLock:
+    """Verrou lecteurs / rédacteur : lectures concurrentes, écritures exclusives et prioritaires.
+
+    Réentrant : un thread qui détient déjà le verrou (en lecture ou en écriture) peut le reprendre en lecture,
+    et le rédacteur peut le reprendre en écriture. Passer d'une lecture à une écriture est interdit.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, 'depth', 0)
+        if depth or self._writer == threading.get_ident():
+            # Déjà détenu par ce thread : pas d'attente (sinon blocage face à un rédacteur en attente)
+            self._local.depth = depth + 1
+            try: yield
+            finally: self._local.depth = depth
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+        try: yield
+        finally:
+            self._local.depth = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers: self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            yield
+            return
+        if getattr(self._local, 'depth', 0):
+            raise RuntimeError("écriture demandée par un thread qui détient déjà le verrou en lecture")
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+        try: yield
+        finally:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class ShardedCounter:
+    """Compteurs sans contention : chaque thread incrémente sa propre copie, créée par factory().
+
+    Les copies (qui doivent offrir add et merge) sont lues ensemble par fold() ; celles des threads terminés
+    sont alors fusionnées dans la base.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+        self._shards = [] # [(thread, copie)]
+        self._shards_lock = threading.Lock()
+        self._base = factory()
+
+    def add(self, *args):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = self._factory()
+            with self._shards_lock: self._shards.append((threading.current_thread(), shard))
+        shard.add(*args)
+
+    def fold(self, fn):
+        """Appelle fn sur la base puis sur chaque copie des threads vivants (fn ne doit que les lire)."""
+        with self._shards_lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive(): alive.append((thread, shard))
+                else: self._base.merge(shard)
+            self._shards = alive
+            fn(self._base)
+            for _, shard in alive: fn(shard)
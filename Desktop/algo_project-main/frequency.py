@@ -0,0 +1,173 @@
+"""Fréquences des dérivés vérifiés en mémoire bornée : compteurs Space-Saving (Metwally et al., 2005).
+
+Un résumé de capacité m garde au plus m éléments. Quand il est plein, un nouvel élément remplace celui de
+plus petit compte c et hérite de c + 1, avec une erreur c. Garanties, pour un flux de N incréments :
+- compte - erreur <= fréquence réelle <= compte (le compte ne sous-estime jamais) ;
+- erreur <= N / m : tout élément de fréquence réelle > N / m est présent dans le résumé.
+Deux résumés se fusionnent (somme des comptes, un élément absent d'un côté y vaut au plus son plus petit
+compte) en gardant ces bornes pour le flux combiné : c'est ce qui permet de répartir les comptes entre
+threads et entre processus.
+"""
+import heapq
+import json
+
+from persistence import atomic_write
+
+
+class SpaceSaving:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0 # N : somme des incréments vus (bornes d'erreur)
+        self.counts = {} # élément -> [compte, erreur]
+        self.heap = [] # (compte, élément), un par élément ; périmé si le compte a augmenté depuis
+        # Borne sur le compte d'un élément absent quand le résumé n'est pas plein : 0 au départ, mais après
+        # discard un élément évincé auparavant peut valoir jusqu'au plus petit compte d'alors
+        self.floor = 0
+
+    def add(self, item, n=1):
+        self.total += n
+        entry = self.counts.get(item)
+        if entry is not None:
+            entry[0] += n
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = [self.floor + n, self.floor]
+            heapq.heappush(self.heap, (self.floor + n, item))
+            return
+        # Plein : on évince le plus petit compte, en remettant à jour les entrées périmées du tas
+        while True:
+            count, victim = self.heap[0]
+            current = self.counts[victim][0]
+            if current == count: break
+            heapq.heapreplace(self.heap, (current, victim))
+        heapq.heapreplace(self.heap, (count + n, item))
+        del self.counts[victim]
+        self.counts[item] = [count + n, count]
+
+    def min_count(self):
+        """Borne sur le compte d'un élément absent : floor tant que le résumé n'est pas plein."""
+        values = list(self.counts.values())
+        if len(values) < self.capacity: return self.floor
+        return min(c for c, _ in values)
+
+    def merge(self, other):
+        # list(...) : other peut être incrémenté par son thread pendant la fusion
+        theirs = list(other.counts.items())
+        mine_min, their_min = self.min_count(), other.min_count()
+        combined = {item: [c + their_min, e + their_min] for item, (c, e) in self.counts.items()}
+        for item, (c, e) in theirs:
+            entry = combined.get(item)
+            if entry is None: combined[item] = [c + mine_min, e + mine_min]
+            else:
+                # Présent des deux côtés : on retire la borne ajoutée ci-dessus
+                entry[0] += c - their_min
+                entry[1] += e - their_min
+        if len(combined) > self.capacity:
+            combined = dict(heapq.nlargest(self.capacity, combined.items(), key=lambda kv: kv[1][0]))
+        self.counts = combined
+        self.heap = [(c, item) for item, (c, _) in combined.items()]
+        heapq.heapify(self.heap)
+        self.total += other.total
+        # Élément absent des deux côtés : au plus la somme des deux bornes
+        self.floor = mine_min + their_min
+
+    def discard(self, pred):
+        """Retire les éléments pour lesquels pred(élément) est vrai."""
+        dropped = [item for item in self.counts if pred(item)]
+        if not dropped: return
+        # Les éléments évincés jusqu'ici restent bornés par le plus petit compte actuel
+        self.floor = self.min_count()
+        for item in dropped: del self.counts[item]
+        self.heap = [(c, item) for item, (c, _) in self.counts.items()]
+        heapq.heapify(self.heap)
+
+    def top(self, k):
+        """Les k plus grands comptes : [(élément, compte, erreur)]."""
+        best = heapq.nlargest(k, self.counts.items(), key=lambda kv: kv[1][0])
+        return [(item, c, e) for item, (c, e) in best]
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "total": self.total, "floor": self.floor,
+                "items": [[item, c, e] for item, (c, e) in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data, capacity=None):
+        summary = cls(capacity or data["capacity"])
+        summary.total = data["total"]
+        summary.floor = data.get("floor", 0)
+        # Capacité réduite depuis l'écriture : on ne garde que les plus grands comptes
+        items = heapq.nlargest(summary.capacity, data["items"], key=lambda it: it[1])
+        for item, c, e in items:
+            summary.counts[tuple(item) if isinstance(item, list) else item] = [c, e]
+        summary.heap = [(c, item) for item, (c, _) in summary.counts.items()]
+        heapq.heapify(summary.heap)
+        return summary
+
+
+class FrequencyTracker:
+    """Un résumé global des couples (racine, mot) et un petit résumé par racine vérifiée.
+
+    Mémoire : au plus global_capacity + per_root_capacity x (racines ayant au moins un dérivé vérifié) entrées.
+    """
+
+    def __init__(self, global_capacity=1024, per_root_capacity=16):
+        self.global_capacity, self.per_root_capacity = global_capacity, per_root_capacity
+        self.overall = SpaceSaving(global_capacity)
+        self.roots = {} # racine -> SpaceSaving des mots
+
+    def add(self, root, word, n=1):
+        self.overall.add((root, word), n)
+        summary = self.roots.get(root)
+        if summary is None: summary = self.roots[root] = SpaceSaving(self.per_root_capacity)
+        summary.add(word, n)
+
+    def merge(self, other, roots=None, overall_only=False):
+        """Ajoute les comptes de other ; avec roots, seulement les résumés de ces racines (pas le résumé global).
+
+        overall_only : seulement le résumé global (classement de toutes les racines, sans parcourir les résumés par racine).
+        """
+        if overall_only:
+            self.overall.merge(other.overall)
+            return
+        if roots is None:
+            self.overall.merge(other.overall)
+            items = list(other.roots.items())
+        else:
+            items = [(r, other.roots[r]) for r in roots if r in other.roots]
+        for root, summary in items:
+            mine = self.roots.get(root)
+            if mine is None: mine = self.roots[root] = SpaceSaving(self.per_root_capacity)
+            mine.merge(summary)
+
+    def discard(self, root):
+        self.roots.pop(root, None)
+        self.overall.discard(lambda item: item[0] == root)
+
+    def retain(self, known):
+        """Oublie les racines absentes de known (supprimées, éventuellement par un autre processus)."""
+        for root in [r for r in self.roots if r not in known]: del self.roots[root]
+        self.overall.discard(lambda item: item[0] not in known)
+
+    def counts_for(self, root):
+        summary = self.roots.get(root)
+        return {word: c for word, (c, _) in summary.counts.items()} if summary else {}
+
+    def top(self, k=10, root=None):
+        """Les k dérivés les plus vérifiés (d'une racine, ou de toutes), avec compte et erreur maximale."""
+        if root is None:
+            return [{"root": r, "word": w, "count": c, "error": e} for (r, w), c, e in self.overall.top(k)]
+        summary = self.roots.get(root)
+        if not summary: return []
+        return [{"root": root, "word": w, "count": c, "error": e} for w, c, e in summary.top(k)]
+
+    def dump(self, path):
+        data = {"overall": self.overall.to_dict(), "roots": {r: s.to_dict() for r, s in self.roots.items()}}
+        atomic_write(path, [json.dumps(data, ensure_ascii=False)])
+
+    @classmethod
+    def load(cls, path, global_capacity=1024, per_root_capacity=16):
+        tracker = cls(global_capacity, per_root_capacity)
+        with open(path, encoding='utf-8') as f: data = json.load(f)
+        tracker.overall = SpaceSaving.from_dict(data["overall"], global_capacity)
+        tracker.roots = {r: SpaceSaving.from_dict(s, per_root_capacity) for r, s in data["roots"].items()}
+        return tracker
@@ -1,32 +1,116 @@
+import heapq
+import json
 import os
 import re
+import threading
+from itertools import islice, takewhile
+
+from cache import MISSING, LRUCache
+from concurrency import RWLock, ShardedCounter
+from frequency import FrequencyTracker
+from metrics import REGISTRY
+from morphology import OMITTED, SchemeTransducer
+from persistence import atomic_write
+from snapshot import read_snapshot, write_snapshot
+from trie import DerivativeTrie, edit_row, levenshtein
+from vectorized import DerivationEngine, np
+
+# Racine trilitère ou quadrilitère
+ARABIC_ROOT_RE = re.compile(r'^[\u0621-\u064A]{3,4}$')
+ARABIC_LETTERS = ''.join(map(chr, range(0x0621, 0x064B)))
+TASHKEEL_RE = re.compile(r'[\u064B-\u0652]')
+# Un mot = suite de lettres arabes, tashkeel compris
+ARABIC_TOKEN_RE = re.compile(r'[\u0621-\u064A\u064B-\u0652]+')
+# Au-delà de cette longueur, strip_tashkeel n'est pas mis en cache (textes longs)
+NORM_CACHE_MAX_LEN = 32
+# schemes.txt contient des lignes « nom,catégorie » : virgule et sauts de ligne interdits dans un nom,
+# sauts de ligne interdits dans une catégorie (\0 : bourrage de l'instantané binaire)
+SCHEME_NAME_FORBIDDEN = set(',\t\r\n\0')
+SCHEME_CAT_FORBIDDEN = set('\r\n\0')
+# Construction du trie : modifications du lexique au plus rejouées sous verrou d'écriture (cf. _build_trie)
+TRIE_CATCHUP_MAX = 32
+# Recherche approchée : distance d'édition maximale ; lettres radicales devinées ou corrigées au plus (au-delà,
+# presque toutes les racines trilitères conviennent) ; nombre maximal de dérivés régénérés et mesurés par mot
+FUZZY_MAX_DISTANCE = 2
+FUZZY_ROOT_EDITS = 1
+FUZZY_MAX_CHECKS = 2000
 
 class Node:
+    # __slots__ : pas de __dict__ par noeud, l'arbre reste compact même à 100k racines
+    __slots__ = ('key', 'left', 'right', 'height', 'size')
+
     def __init__(self, key):
         self.key = key
         self.left = self.right = None
         self.height = 1
-        self.derived_words = {} 
+        self.size = 1 # Nombre de noeuds du sous-arbre : rang et sélection en O(log n)
 
 class SARF_Logic:
-    def __init__(self):
+    def __init__(self, cache_size=4096, freq_capacity=1024, root_freq_capacity=16):
         self.root_tree = None
+        # Index de hachage synchronisé avec l'arbre AVL : racine -> Node (recherche exacte en O(1))
+        self.root_index = {}
         self.schemes = {}
+        # Schèmes compilés en un automate (morphology.py) : génération et analyse, racines faibles et quadrilitères
+        self.fst = SchemeTransducer()
+        # Caches LRU des fonctions pures apply_scheme et strip_tashkeel
+        self.apply_cache = LRUCache(cache_size)
+        self.norm_cache = LRUCache(cache_size)
         # Chemins par défaut pour la sauvegarde
         self.r_path = 'data/roots.txt'
         self.s_path = 'data/schemes.txt'
+        # Instantané binaire optionnel (démarrage rapide), prioritaire s'il est plus récent que les fichiers texte
+        self.snap_path = None
+        # Journal des modifications (persistance différée) ; sans journal, save_data est appelé à chaque modification
+        self.store = None
+        # Lectures concurrentes, écritures sérialisées (serveur WSGI multi-thread)
+        self.lock = RWLock()
+        # Fréquences des dérivés vérifiés, en mémoire bornée (résumés Space-Saving, cf. frequency.py) :
+        # - frequencies : état du fichier à la dernière synchronisation (tous processus confondus) ;
+        # - derived_counts : comptes depuis, une copie par thread ; retired : ceux du cycle précédent.
+        self.freq_capacity = (freq_capacity, root_freq_capacity)
+        self.freq_path = None
+        self.frequencies = FrequencyTracker(*self.freq_capacity)
+        self.derived_counts = ShardedCounter(self._new_tracker)
+        self.retired_counts = None
+        # Moteur NumPy (si disponible) : gabarits réguliers des schèmes, reconstruits à la demande
+        self.engine = None
+        # Trie des dérivés pour /suggest : construit à la première utilisation (hors verrou d'écriture, un seul
+        # constructeur à la fois), puis tenu à jour ; trie_pending : modifications à rejouer sur le trie en construction
+        self.trie = None
+        self.trie_pending = None
+        self.trie_build_lock = threading.Lock()
+
+    def _new_tracker(self):
+        return FrequencyTracker(*self.freq_capacity)
 
-    def is_arabic_triple(self, text):
-        return bool(re.match(r'^[\u0621-\u064A]{3}$', text))
+    def is_arabic_root(self, text):
+        return bool(ARABIC_ROOT_RE.match(text))
+
+    def is_valid_scheme(self, name, category=""):
+        return (isinstance(name, str) and isinstance(category, str) and bool(name.strip())
+                and SCHEME_NAME_FORBIDDEN.isdisjoint(name) and SCHEME_CAT_FORBIDDEN.isdisjoint(category))
 
     def strip_tashkeel(self, text):
         if not text: return ""
-        return re.sub(r'[\u064B-\u0652]', '', text)
+        if len(text) > NORM_CACHE_MAX_LEN: return TASHKEEL_RE.sub('', text)
+        res = self.norm_cache.get(text, MISSING)
+        if res is MISSING:
+            res = TASHKEEL_RE.sub('', text)
+            self.norm_cache.put(text, res)
+        return res
+
+    def cache_stats(self):
+        return {"apply_scheme": self.apply_cache.stats(), "strip_tashkeel": self.norm_cache.stats(),
+                "derivative_trie": self.trie.stats() if self.trie else None, "transducer": self.fst.stats()}
 
     # --- MÉCANISMES AVL ---
     def get_height(self, node):
         return node.height if node else 0
 
+    def get_size(self, node):
+        return node.size if node else 0
+
     def get_balance(self, node):
         if not node: return 0
         return self.get_height(node.left) - self.get_height(node.right)
@@ -38,6 +122,8 @@ class SARF_Logic:
         y.left = T2
         y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
         x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
+        y.size = 1 + self.get_size(y.left) + self.get_size(y.right)
+        x.size = 1 + self.get_size(x.left) + self.get_size(x.right)
         return x
 
     def _left_rotate(self, x):
@@ -47,169 +133,889 @@ class SARF_Logic:
         x.right = T2
         x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
         y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
+        x.size = 1 + self.get_size(x.left) + self.get_size(x.right)
+        y.size = 1 + self.get_size(y.left) + self.get_size(y.right)
         return y
 
+    def _rebalance(self, node):
+        """Met à jour la hauteur du noeud et applique la rotation nécessaire ; renvoie la nouvelle racine du sous-arbre."""
+        node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
+        balance = self.get_balance(node)
+        if balance > 1:
+            if self.get_balance(node.left) < 0: node.left = self._left_rotate(node.left)
+            return self._right_rotate(node)
+        if balance < -1:
+            if self.get_balance(node.right) > 0: node.right = self._right_rotate(node.right)
+            return self._left_rotate(node)
+        return node
+
+    def _rebalance_path(self, path):
+        """Rééquilibre de bas en haut le chemin parcouru depuis la racine ; renvoie la racine de l'arbre.
+
+        Les tailles du chemin sont déjà à jour (insert_root / delete_root) : l'arrêt anticipé ne concerne que les hauteurs.
+        """
+        for i in range(len(path) - 1, 0, -1):
+            node, parent = path[i], path[i - 1]
+            old_height = node.height
+            sub = self._rebalance(node)
+            if sub is not node:
+                if parent.left is node: parent.left = sub
+                else: parent.right = sub
+            elif node.height == old_height:
+                return path[0] # Sous-arbre inchangé : les ancêtres le sont aussi
+        return self._rebalance(path[0])
+
     def insert_root(self, root, key):
-        if not root: return Node(key)
-        if key < root.key: root.left = self.insert_root(root.left, key)
-        elif key > root.key: root.right = self.insert_root(root.right, key)
-        else: return root 
-
-        root.height = 1 + max(self.get_height(root.left), self.get_height(root.right))
-        balance = self.get_balance(root)
-
-        if balance > 1 and key < root.left.key: return self._right_rotate(root)
-        if balance < -1 and key > root.right.key: return self._left_rotate(root)
-        if balance > 1 and key > root.left.key:
-            root.left = self._left_rotate(root.left)
-            return self._right_rotate(root)
-        if balance < -1 and key < root.right.key:
-            root.right = self._right_rotate(root.right)
-            return self._left_rotate(root)
-        return root
+        path, node = [], root
+        while node:
+            if key == node.key: return root
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        if REGISTRY.enabled: REGISTRY.observe('sarf_tree_nodes_visited', len(path), op='insert_root')
+
+        node = self.root_index[key] = Node(key)
+        self._trie_change([key], add=True)
+        if not path: return node
+        for n in path: n.size += 1
+        parent = path[-1]
+        if key < parent.key: parent.left = node
+        else: parent.right = node
+        return self._rebalance_path(path)
 
     def search_root(self, root, key):
-        if not root or root.key == key: return root
-        if key < root.key: return self.search_root(root.left, key)
-        return self.search_root(root.right, key)
+        if REGISTRY.enabled: return self._search_root_counted(root, key)
+        while root and root.key != key:
+            root = root.left if key < root.key else root.right
+        return root
 
-    def delete_root(self, root, key):
-        if not root: return root
-        if key < root.key: root.left = self.delete_root(root.left, key)
-        elif key > root.key: root.right = self.delete_root(root.right, key)
-        else:
-            if not root.left: return root.right
-            elif not root.right: return root.left
-            temp = self._min_node(root.right)
-            root.key = temp.key
-            root.right = self.delete_root(root.right, temp.key)
-
-        if not root: return root
-        root.height = 1 + max(self.get_height(root.left), self.get_height(root.right))
-        balance = self.get_balance(root)
-
-        if balance > 1 and self.get_balance(root.left) >= 0: return self._right_rotate(root)
-        if balance > 1 and self.get_balance(root.left) < 0:
-            root.left = self._left_rotate(root.left)
-            return self._right_rotate(root)
-        if balance < -1 and self.get_balance(root.right) <= 0: return self._left_rotate(root)
-        if balance < -1 and self.get_balance(root.right) > 0:
-            root.right = self._right_rotate(root.right)
-            return self._left_rotate(root)
+    def _search_root_counted(self, root, key):
+        visited = 0
+        while root and root.key != key:
+            visited += 1
+            root = root.left if key < root.key else root.right
+        REGISTRY.observe('sarf_tree_nodes_visited', visited + (root is not None), op='search_root')
         return root
 
+    def find_root(self, key):
+        """Recherche exacte via l'index de hachage (l'arbre reste utilisé pour le parcours ordonné)."""
+        return self.root_index.get(key)
+
+    def delete_root(self, root, key):
+        path, node = [], root
+        while node and node.key != key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        if REGISTRY.enabled: REGISTRY.observe('sarf_tree_nodes_visited', len(path) + (node is not None), op='delete_root')
+        if not node: return root
+
+        if self.root_index.get(key) is node: del self.root_index[key]
+        self._trie_change([key], add=False)
+        if node.left and node.right:
+            # Le successeur prend la place du noeud supprimé
+            path.append(node)
+            succ = node.right
+            while succ.left:
+                path.append(succ)
+                succ = succ.left
+            node.key = succ.key
+            self.root_index[succ.key] = node
+            node = succ
+
+        child = node.left or node.right
+        if not path: return child
+        for n in path: n.size -= 1
+        parent = path[-1]
+        if parent.left is node: parent.left = child
+        else: parent.right = child
+        return self._rebalance_path(path)
+
+    # --- STATISTIQUES D'ORDRE (tailles des sous-arbres) ---
+    def rank(self, key):
+        """Nombre de racines strictement inférieures à key, en O(log n)."""
+        r, node = 0, self.root_tree
+        while node:
+            if key <= node.key: node = node.left
+            else:
+                r += self.get_size(node.left) + 1
+                node = node.right
+        return r
+
+    def select(self, i):
+        """i-ème racine (à partir de 0) par ordre alphabétique, ou None."""
+        node = self.root_tree
+        while node:
+            left = self.get_size(node.left)
+            if i < left: node = node.left
+            elif i == left: return node
+            else:
+                i -= left + 1
+                node = node.right
+        return None
+
+    def count_range(self, lo=None, hi=None):
+        """Nombre de racines dans [lo, hi) (bornes None = ouvertes)."""
+        with self.lock.read():
+            end = self.get_size(self.root_tree) if hi is None else self.rank(hi)
+            return max(0, end - (0 if lo is None else self.rank(lo)))
+
+    def _iter_from(self, i):
+        """Parcours infixe à partir de la i-ème racine : O(log n) pour se placer, puis comme _iter_nodes."""
+        stack, node = [], self.root_tree
+        while node:
+            left = self.get_size(node.left)
+            if i < left:
+                stack.append(node)
+                node = node.left
+            elif i == left:
+                stack.append(node)
+                break
+            else:
+                i -= left + 1
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+
     def _min_node(self, node):
         curr = node
         while curr.left: curr = curr.left
         return curr
 
+    def bulk_build(self, sorted_keys):
+        """Construit en O(n) un arbre parfaitement équilibré à partir de clés triées et uniques (remplace l'arbre actuel)."""
+        keys = list(sorted_keys)
+        index = {}
+
+        def build(lo, hi):
+            # Profondeur de récursion en O(log n)
+            if lo > hi: return None
+            mid = (lo + hi) // 2
+            node = index[keys[mid]] = Node(keys[mid])
+            node.left, node.right = build(lo, mid - 1), build(mid + 1, hi)
+            # Sous-arbre parfaitement équilibré de taille m : hauteur = nombre de bits de m
+            node.size = hi - lo + 1
+            node.height = node.size.bit_length()
+            return node
+
+        self.root_tree = build(0, len(keys) - 1)
+        self.root_index = index
+        return self.root_tree
+
     # --- MOTEURS DE TRANSFORMATION & ANALYSE ---
     def apply_scheme(self, root_word, scheme_name):
-        if len(root_word) != 3: return None
-        root_word, scheme_name = self.strip_tashkeel(root_word), self.strip_tashkeel(scheme_name)
-        res = ""
-        for char in scheme_name:
-            if char == 'ف': res += root_word[0]
-            elif char == 'ع': res += root_word[1]
-            elif char == 'ل': res += root_word[2]
-            else: res += char
+        key = (root_word, scheme_name)
+        res = self.apply_cache.get(key, MISSING)
+        if res is MISSING:
+            res = self._apply_scheme(root_word, scheme_name)
+            self.apply_cache.put(key, res)
         return res
 
-    def populate_derivatives(self, root_key):
-        node = self.search_root(self.root_tree, root_key)
-        if not node: return False
+    def _apply_scheme(self, root_word, scheme_name):
+        return self.fst.apply(self.strip_tashkeel(root_word), self.strip_tashkeel(scheme_name))
+
+    def generate_batch(self, roots=None, chunk_size=2000):
+        """Génère les dérivés de plusieurs racines (toutes celles de l'arbre si roots est None), une ligne NDJSON par racine.
+
+        Dans le processus, paquet par paquet : un pool de processus ne ferait que format() dans les fils et
+        renverrait tout le texte par pickle, plus lent que de le produire ici (et sans flux : map soumet tout).
+        """
+        with self.lock.read():
+            results_template = self._results_template()
+            # Liste figée des racines : l'arbre peut changer pendant que le flux est consommé
+            if roots is None: keys = iter([node.key for node in self._iter_nodes(self.root_tree)])
+            else: keys = (self.strip_tashkeel(str(r).strip()) for r in roots)
+        # Chaque paquet porte (racine, connue ?, dérivés) : les racines faibles ou quadrilitères sont dérivées
+        # par l'automate, les autres par le gabarit
+        chunks = iter(lambda: [self._chunk_entry(k) for k in islice(keys, chunk_size)], [])
+        for chunk in chunks:
+            yield from _derive_chunk(results_template, chunk)
+
+    def _chunk_entry(self, root):
+        known = root in self.root_index
+        if not known or self.fst.is_regular(root): return root, known, None
+        return root, known, [{"scheme": s, "word": w} for s, w in self.derivatives([root])[0] if w is not None]
+
+    def _results_template(self):
+        """Gabarit JSON des dérivés réguliers : une racine trilitère donne sa ligne complète en un seul format()."""
+        parts = []
         for s_name in self.schemes:
-            word = self.apply_scheme(root_key, s_name)
-            if word and word not in node.derived_words:
-                node.derived_words[word] = 0
-        return True
+            template = self.fst.template(s_name)
+            s_json = json.dumps(s_name, ensure_ascii=False).replace('{', '{{').replace('}', '}}')
+            parts.append('{{"scheme": ' + s_json + ', "word": ' + json.dumps(template, ensure_ascii=False) + '}}')
+        return '[' + ', '.join(parts) + ']'
+
+    def generate_derivatives(self, root_key):
+        """[(schème, mot)] des schèmes applicables, ou None si la racine est inconnue (rien n'est stocké dans l'arbre)."""
+        with self.lock.read():
+            if root_key not in self.root_index: return None
+            return [(s_name, word) for s_name, word in self.derivatives([root_key])[0] if word is not None]
+
+    def derivatives(self, roots):
+        """Pour chaque racine (sans tashkeel), [(schème, mot)] dans l'ordre de self.schemes.
+
+        Le mot vaut None si le schème ne s'applique pas (racine quadrilitère, schème à un seul ل).
+        Le moteur NumPy ne connaît que les gabarits réguliers : les racines faibles ou quadrilitères passent par l'automate.
+        """
+        if np is None:
+            return [[(s_name, self.apply_scheme(r, s_name)) for s_name in self.schemes] for r in roots]
+        with self.lock.read():
+            if self.engine is None: self.engine = DerivationEngine(self.schemes)
+            engine, fst = self.engine, self.fst
+            words = iter(engine.derive([r for r in roots if len(r) == 3]))
+            res = []
+            for r in roots:
+                if len(r) != 3:
+                    res.append([(s_name, self.apply_scheme(r, s_name)) for s_name in engine.schemes])
+                    continue
+                pairs = list(zip(engine.schemes, next(words)))
+                # Racine faible : seuls les schèmes soumis à une règle sont refaits par l'automate
+                if not fst.is_regular(r):
+                    pairs = [(s_name, fst.apply(r, s_name) if s_name in fst.ruled else word) for s_name, word in pairs]
+                res.append(pairs)
+            return res
 
     def identify_word(self, word):
         results = []
         w_clean = self.strip_tashkeel(word)
-        for s_name in self.schemes:
-            s_clean = self.strip_tashkeel(s_name)
-            if len(w_clean) == len(s_clean):
-                r1, r2, r3, possible = None, None, None, True
-                for wc, sc in zip(w_clean, s_clean):
-                    if sc == 'ف': r1 = wc
-                    elif sc == 'ع': r2 = wc
-                    elif sc == 'ل': r3 = wc
-                    elif wc != sc: possible = False; break
-                if possible and r1 and r2 and r3:
-                    root_cand = r1 + r2 + r3
-                    if self.search_root(self.root_tree, root_cand):
-                        results.append({"root": root_cand, "scheme": s_name, "word": word})
+        with self.lock.read():
+            for s_name, root_cand in self._scheme_candidates(w_clean):
+                if root_cand in self.root_index:
+                    results.append({"root": root_cand, "scheme": s_name, "word": word})
         return results
 
+    def identify_batch(self, words):
+        """identify_word sur une liste de mots : mêmes résultats, dans le même ordre ; chaque mot distinct n'est analysé qu'une fois."""
+        cleaned = [self.strip_tashkeel(w) for w in words]
+        found = {}
+        with self.lock.read():
+            for w_clean in cleaned:
+                if w_clean not in found:
+                    found[w_clean] = [(s_name, root_cand) for s_name, root_cand in self._scheme_candidates(w_clean)
+                                      if root_cand in self.root_index]
+        return [[{"root": root, "scheme": s_name, "word": w} for s_name, root in found[c]] for w, c in zip(words, cleaned)]
+
+    def suggest(self, prefix, k=10):
+        """Au plus k dérivés commençant par prefix, avec leurs analyses (racine, schème)."""
+        prefix = self.strip_tashkeel(prefix)
+        trie = self._ensure_trie()
+        with self.lock.read():
+            return [{"word": word, "results": [{"root": r, "scheme": s} for r, s in payloads]}
+                    for word, payloads in trie.complete(prefix, k)]
+
+    def _ensure_trie(self):
+        """Le trie des dérivés, construit s'il manque.
+
+        La construction (quelques secondes sur un grand lexique) se fait hors du verrou d'écriture : lectures et
+        modifications continuent. Celles faites entre-temps sont notées (trie_pending) puis rejouées, dans l'ordre,
+        sur le nouveau trie avant sa mise en place. Un rechargement pendant la construction la rend caduque.
+        """
+        while True:
+            trie = self.trie
+            if trie is not None: return trie
+            with self.trie_build_lock:
+                if self.trie is None: self._build_trie()
+
+    def _build_trie(self):
+        with self.lock.read():
+            pending = self.trie_pending = []
+            roots = list(self.root_index)
+        try:
+            trie = DerivativeTrie()
+            # Verrou de lecture paquet par paquet : les écrivains passent entre deux paquets
+            self._trie_add_roots(trie, roots)
+            # Rattrapage par lots sous verrou de lecture, tant que les modifications arrivent plus vite ;
+            # seul le dernier lot, court, est rejoué sous verrou d'écriture, juste avant la mise en place
+            while True:
+                with self.lock.write():
+                    if self.trie_pending is not pending: return
+                    if len(pending) <= TRIE_CATCHUP_MAX:
+                        for change in pending: self._trie_update(trie, *change)
+                        self.trie, self.trie_pending = trie, None
+                        return
+                    batch, pending = pending, []
+                    self.trie_pending = pending
+                for change in batch:
+                    with self.lock.read(): self._trie_update(trie, *change)
+        except BaseException:
+            # Construction avortée : les écrivains n'ont plus rien à noter
+            with self.lock.write():
+                if self.trie_pending is pending: self.trie_pending = None
+            raise
+
+    def _trie_add_roots(self, trie, roots, chunk_size=2048):
+        """Ajoute au trie tous les dérivés de roots, calculés par paquets (moteur NumPy si disponible).
+
+        Chaque paquet reflète le lexique d'un instant (racines encore présentes, schèmes de ce moment) : pendant
+        une construction, les modifications notées depuis le corrigent, quel que soit l'instant.
+        """
+        for start in range(0, len(roots), chunk_size):
+            with self.lock.read():
+                chunk = [root for root in roots[start:start + chunk_size] if root in self.root_index]
+                derived = self.derivatives(chunk)
+            for root, pairs in zip(chunk, derived):
+                for s_name, word in pairs:
+                    if word is not None: trie.add(word, (root, s_name))
+
+    def _trie_change(self, roots=None, schemes=None, add=True):
+        """Sous verrou d'écriture : ajoute au trie ou en retire les dérivés roots x schemes (None : toutes les racines,
+        tous les schèmes actuels), et note la modification pour le trie en construction s'il y en a un."""
+        if self.trie is None and self.trie_pending is None: return
+        # Listes figées maintenant : rejouées plus tard, elles doivent décrire l'état de ce moment
+        roots = list(self.root_index) if roots is None else roots
+        schemes = list(self.schemes) if schemes is None else schemes
+        if self.trie_pending is not None: self.trie_pending.append((roots, schemes, add))
+        if self.trie: self._trie_update(self.trie, roots, schemes, add)
+
+    def _trie_update(self, trie, roots, schemes, add):
+        # Tous les schèmes actuels : calcul par paquets, comme à la construction
+        if add and len(roots) > 1 and schemes == list(self.schemes): return self._trie_add_roots(trie, roots)
+        for root in roots:
+            for s_name in schemes:
+                # Hors cache : chaque couple n'est vu qu'une fois, il chasserait les entrées utiles
+                word = self._apply_scheme(root, s_name)
+                if word is None: continue
+                if add: trie.add(word, (root, s_name))
+                else: trie.remove(word, (root, s_name))
+
+    # --- RECHERCHE APPROCHÉE ---
+    def fuzzy_roots(self, word, k=1, wildcard=None):
+        """[(distance, racine)] des racines à distance d'édition <= k de word, des plus proches aux plus éloignées.
+
+        Automate de Levenshtein déroulé sur les clés triées de l'AVL : les lignes de la matrice sont partagées entre
+        racines de même préfixe, et dès qu'un préfixe est à plus de k modifications, rank() saute en O(log n) toutes
+        les racines qui le prolongent. Aucun index à maintenir : toujours à jour avec /manage.
+        Une lettre wildcard de word s'accorde avec n'importe quelle lettre (lettre radicale à deviner).
+        """
+        res, rows, prev = [], [list(range(len(word) + 1))], ''
+        with self.lock.read():
+            i, n = 0, len(self.root_index)
+            nodes = self._iter_from(0)
+            while i < n:
+                key = next(nodes).key
+                common, limit = 0, min(len(key), len(prev))
+                while common < limit and key[common] == prev[common]: common += 1
+                del rows[common + 1:]
+                for j in range(common, len(key)):
+                    rows.append(edit_row(rows[-1], word, key[j], wildcard))
+                    if min(rows[-1]) > k:
+                        prev = key[:j + 1]
+                        if j == len(key) - 1: i += 1 # Dernière lettre : la racine suivante est la prochaine candidate
+                        else:
+                            i = self.rank(self.prefix_range(prev)[1])
+                            nodes = self._iter_from(i)
+                        break
+                else:
+                    if rows[-1][-1] <= k: res.append((rows[-1][-1], key))
+                    prev = key
+                    i += 1
+        res.sort()
+        return res
+
+    def identify_fuzzy(self, word, k=1, limit=10, derivatives=False, max_checks=FUZZY_MAX_CHECKS):
+        """Les analyses (racine, schème) dont le dérivé est à distance d'édition <= k du mot, les plus proches d'abord.
+
+        L'automate des schèmes tolère jusqu'à k modifications des lettres fixes (approximate) ; le reste du budget sert
+        aux lettres radicales, remplacées par les racines connues les plus proches (fuzzy_roots), dans la limite de
+        FUZZY_ROOT_EDITS lettres radicales oubliées ou mal tapées. k est ramené entre 0 et FUZZY_MAX_DISTANCE. Les
+        candidats sont examinés des moins coûteux aux plus coûteux, chacun sous son propre verrou de lecture (les
+        écrivains passent entre deux) ; on s'arrête dès que les limit meilleures analyses sont sûres, ou après
+        max_checks dérivés mesurés (résultat partiel, pris parmi les candidats les moins coûteux).
+        Avec derivatives=True, on cherche aussi dans le trie des dérivés (construit à la demande).
+        """
+        w_clean = self.strip_tashkeel(word)
+        k = min(max(k, 0), FUZZY_MAX_DISTANCE)
+        with self.lock.read(): found = self.fst.approximate(w_clean, k)
+        # Candidats regroupés par (lettres, modifications des lettres fixes) : une recherche de racines par groupe
+        groups = {}
+        for (s_name, letters), cost in found.items():
+            if None not in letters: groups.setdefault((''.join(letters), cost), []).append(s_name)
+        best, near, checks = {}, {}, 0 # (racine, schème) -> (distance, dérivé) ; (lettres, budget) -> racines
+        for (cand, cost), s_names in sorted(groups.items(), key=lambda g: g[0][1]):
+            # Une analyse à distance d se trouve parmi les candidats de coût <= d : si les limit meilleures sont à
+            # moins de cost, les candidats restants ne peuvent plus les déloger
+            if 0 < limit <= len(best) and sorted(d for d, _ in best.values())[limit - 1] < cost: break
+            if checks >= max_checks: break
+            budget = min(k - cost, FUZZY_ROOT_EDITS - cand.count(OMITTED))
+            if budget < 0: continue
+            with self.lock.read():
+                if (cand, budget) not in near: near[cand, budget] = self._near_roots(cand, budget)
+                pairs = [(root, s_name, self.apply_scheme(root, s_name)) for root in near[cand, budget] for s_name in s_names]
+            checks += len(pairs)
+            for root, s_name, derived in pairs:
+                if derived is None: continue
+                d = levenshtein(derived, w_clean)
+                if d <= k and d < best.get((root, s_name), (k + 1,))[0]: best[(root, s_name)] = (d, derived)
+        if derivatives:
+            trie = self._ensure_trie()
+            with self.lock.read():
+                for d, derived, payloads in trie.search(w_clean, k):
+                    for key in payloads:
+                        if d < best.get(key, (k + 1,))[0]: best[key] = (d, derived)
+        res = sorted((d, root, s_name, derived) for (root, s_name), (d, derived) in best.items())[:limit]
+        return [{"root": root, "scheme": s_name, "word": derived, "distance": d} for d, root, s_name, derived in res]
+
+    def _near_roots(self, cand, budget):
+        """Racines connues à au plus budget modifications de cand, dont les lettres OMITTED sont à deviner."""
+        omitted = cand.count(OMITTED)
+        if not budget and omitted == 1:
+            # Une seule lettre à deviner, sans autre modification : une recherche par lettre possible
+            return [r for r in (cand.replace(OMITTED, c) for c in ARABIC_LETTERS) if r in self.root_index]
+        if not budget and not omitted: return [cand] if cand in self.root_index else []
+        if budget == 1 and not omitted:
+            # Une modification : les voisins de cand (lettre remplacée, ajoutée ou retirée) se cherchent dans l'index
+            return [r for r in _edits1(cand) if r in self.root_index]
+        # Lettre à deviner : s'accorde avec toute lettre (son oubli est déjà compté dans le coût du candidat)
+        return [root for _, root in self.fuzzy_roots(cand, budget, wildcard=OMITTED)]
+
+    def analyze_stream(self, source, chunk_size=1 << 16, max_distinct=100_000):
+        """Découpe un texte (chaîne ou fichier texte) en mots et analyse chaque mot distinct une seule fois.
+
+        Génère {"word", "results"} à la première occurrence de chaque mot. La lecture se fait par blocs
+        et l'ensemble des mots déjà vus est borné à max_distinct (au-delà, les plus anciens sont oubliés et
+        peuvent réapparaître) : la mémoire ne dépend pas de la taille du texte.
+        """
+        seen = LRUCache(max_distinct)
+        for token in self._tokens(source, chunk_size):
+            w_clean = self.strip_tashkeel(token)
+            if seen.get(w_clean) is not None: continue
+            seen.put(w_clean, True)
+            with self.lock.read():
+                results = [{"root": root_cand, "scheme": s_name}
+                           for s_name, root_cand in self._scheme_candidates(w_clean, 'analyze_stream')
+                           if root_cand in self.root_index]
+            yield {"word": w_clean, "results": results}
+
+    def _tokens(self, source, chunk_size):
+        if isinstance(source, str):
+            for m in ARABIC_TOKEN_RE.finditer(source): yield m.group()
+            return
+        tail = ""
+        for chunk in iter(lambda: source.read(chunk_size), ""):
+            chunk = tail + chunk
+            # Le dernier mot du bloc peut être coupé : on le garde pour le bloc suivant
+            m = None
+            for m in ARABIC_TOKEN_RE.finditer(chunk):
+                if m.end() == len(chunk): break
+                yield m.group()
+            tail = m.group() if m and m.end() == len(chunk) else ""
+        if tail: yield tail
+
+    # --- ANALYSE PAR L'AUTOMATE DES SCHÈMES ---
+    def _scheme_matches(self, w_clean, op='identify_word'):
+        """Génère (schème, lettres radicales lues dans le mot) pour les schèmes qui produisent le mot.
+
+        Une lettre vaut None si le schème ne contient pas la position radicale correspondante.
+        op nomme l'appelant dans la mesure du nombre d'analyses examinées.
+        """
+        matches, examined = self.fst.analyze(w_clean)
+        if REGISTRY.enabled: REGISTRY.observe('sarf_schemes_scanned', examined, op=op)
+        return matches
+
+    def _scheme_candidates(self, w_clean, op='identify_word'):
+        """Génère (schème, racine candidate) quand le schème fixe toutes les lettres radicales."""
+        for s_name, letters in self._scheme_matches(w_clean, op):
+            if None not in letters: yield s_name, ''.join(letters)
+
+    # --- GESTION DES RACINES ---
+    def add_root(self, key):
+        with self.lock.write():
+            if key in self.root_index: return False
+            self.root_tree = self.insert_root(self.root_tree, key)
+            self._persist('add_root', key)
+            return True
+
+    def import_roots(self, lines):
+        """Ajoute en bloc les racines d'un itérable de lignes ; renvoie {"added", "duplicates", "invalid"}.
+
+        Normalisation et validation hors verrou, puis fusion avec l'arbre (_merge_roots). Une seule ligne de
+        journal pour tout l'import : une ligne incomplète n'est jamais rejouée, l'import l'est en entier ou pas du tout.
+        """
+        valid, seen, invalid = set(), 0, 0
+        for line in lines:
+            # Pas de cache ici : chaque ligne n'est vue qu'une fois
+            r = TASHKEEL_RE.sub('', line.strip())
+            if not r: continue
+            if self.is_arabic_root(r):
+                valid.add(r)
+                seen += 1
+            else: invalid += 1
+        with self.lock.write():
+            added = self._merge_roots(sorted(valid))
+            if added: self._persist('add_roots', *added)
+        return {"added": len(added), "duplicates": seen - len(added), "invalid": invalid}
+
+    def _merge_roots(self, keys):
+        """Ajoute des racines triées et uniques (sous verrou d'écriture) ; renvoie celles qui étaient absentes.
+
+        Fusion des nouvelles clés avec le parcours infixe de l'arbre puis bulk_build : O(n + m) au lieu de
+        m insertions en O(log n), sauf si m est assez petit pour que les insertions coûtent moins.
+        """
+        added = [key for key in keys if key not in self.root_index]
+        n = len(self.root_index)
+        if len(added) * max(n.bit_length(), 1) < n:
+            for key in added: self.root_tree = self.insert_root(self.root_tree, key)
+            return added
+        self.bulk_build(list(heapq.merge((node.key for node in self._iter_nodes(self.root_tree)), added)))
+        self._trie_change(added, add=True)
+        return added
+
+    def remove_root(self, key):
+        with self.lock.write():
+            if key not in self.root_index: return False
+            self.root_tree = self.delete_root(self.root_tree, key)
+            self.frequencies.discard(key)
+            self._persist('delete_root', key)
+            return True
+
     # --- GESTION DES SCHÈMES ---
     def add_scheme(self, name, category=""):
+        if not self.is_valid_scheme(name, category): raise ValueError(f"schème invalide : {name!r}, {category!r}")
         name = self.strip_tashkeel(name)
-        if name not in self.schemes:
-            self.schemes[name] = {"cat": category}
-            self.save_data() # Sauvegarde auto
-            return True
-        return False
+        with self.lock.write():
+            if name not in self.schemes:
+                self._set_scheme(name, category)
+                self._persist('add_scheme', name, category)
+                return True
+            return False
 
     def delete_scheme(self, name):
         name = self.strip_tashkeel(name)
-        if name in self.schemes:
-            del self.schemes[name]
-            self.save_data() # Sauvegarde auto
-            return True
-        return False
+        with self.lock.write():
+            if name in self.schemes:
+                self._drop_scheme(name)
+                self._persist('delete_scheme', name)
+                return True
+            return False
+
+    def _set_scheme(self, name, category):
+        # Recompilation incrémentale : seules les réalisations de ce schème entrent dans l'automate
+        if name not in self.schemes:
+            self.fst.add(name)
+            self._trie_change(schemes=[name], add=True)
+        self.schemes[name] = {"cat": category}
+        self._invalidate_scheme_cache(name)
+
+    def _drop_scheme(self, name):
+        del self.schemes[name]
+        self._trie_change(schemes=[name], add=False)
+        self.fst.remove(name)
+        self._invalidate_scheme_cache(name)
+
+    def _invalidate_scheme_cache(self, name):
+        """Retire du cache toutes les applications du schème (clé brute, avec ou sans tashkeel)."""
+        self.apply_cache.discard_if(lambda key: self.strip_tashkeel(key[1]) == name)
+        self.engine = None
 
     # --- PERSISTANCE DES DONNÉES ---
-    def load_data(self, r_path=None, s_path=None):
+    def load_data(self, r_path=None, s_path=None, snap_path=None, freq_path=None):
         if r_path: self.r_path = r_path
         if s_path: self.s_path = s_path
-        
+        if snap_path: self.snap_path = snap_path
+        if freq_path: self.freq_path = freq_path
+
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='load_data'), self.lock.write():
+            # Reconstruit à la demande après chargement ; une construction en cours est abandonnée
+            self.trie = self.trie_pending = None
+            if self._snapshot_is_fresh() and not self.root_tree:
+                self.load_snapshot(self.snap_path)
+            else:
+                self._load_text()
+
+            # Recompilation complète de l'automate après chargement
+            self.fst = SchemeTransducer()
+            for s_name in self.schemes: self.fst.add(s_name)
+            self.apply_cache.clear()
+            self.engine = None
+            if self.freq_path and os.path.exists(self.freq_path):
+                self.frequencies = FrequencyTracker.load(self.freq_path, *self.freq_capacity)
+
+    def _load_text(self):
         if os.path.exists(self.r_path):
+            roots = []
             with open(self.r_path, 'r', encoding='utf-8') as f:
                 for line in f:
-                    r = self.strip_tashkeel(line.strip())
-                    if self.is_arabic_triple(r): self.root_tree = self.insert_root(self.root_tree, r)
+                    # Pas de cache ici : chaque ligne n'est vue qu'une fois
+                    r = TASHKEEL_RE.sub('', line.strip())
+                    if self.is_arabic_root(r): roots.append(r)
+            if self.root_tree:
+                for r in roots: self.root_tree = self.insert_root(self.root_tree, r)
+            else:
+                # Le fichier est normalement trié (save_data écrit en ordre) : on ne trie qu'en cas de besoin
+                if any(a >= b for a, b in zip(roots, roots[1:])): roots = sorted(set(roots))
+                self.bulk_build(roots)
         
         if os.path.exists(self.s_path):
             with open(self.s_path, 'r', encoding='utf-8') as f:
                 for line in f:
-                    parts = line.strip().split(',')
+                    # Une catégorie peut contenir des virgules, pas le nom
+                    parts = line.strip().split(',', 1)
                     if parts: self.schemes[self.strip_tashkeel(parts[0])] = {"cat": parts[1] if len(parts)>1 else "عام"}
 
+    def reload(self):
+        """Recharge tout depuis les fichiers (réécrits par un autre processus)."""
+        with self.lock.write():
+            self.root_tree, self.root_index, self.schemes = None, {}, {}
+            self.load_data()
+
+    def _snapshot_is_fresh(self):
+        if not self.snap_path or not os.path.exists(self.snap_path): return False
+        snap_time = os.path.getmtime(self.snap_path)
+        return all(snap_time >= os.path.getmtime(p) for p in (self.r_path, self.s_path) if os.path.exists(p))
+
+    def load_snapshot(self, path):
+        """Charge un instantané binaire : pas d'expression régulière ni de tri, l'arbre est construit en O(n)."""
+        roots, schemes, counters = read_snapshot(path)
+        self.bulk_build(roots)
+        for s_name, cat in schemes: self.schemes[s_name] = {"cat": cat}
+        # Anciens instantanés : les compteurs exacts sont repris dans les résumés (écrits à la prochaine synchronisation)
+        for root, words in counters.items():
+            for word, n in words.items():
+                if n: self.derived_counts.add(root, word, n)
+
+    def save_snapshot(self, path=None):
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='save_snapshot'):
+            write_snapshot(path or self.snap_path, *self.snapshot())
+
     def save_data(self):
         """Sauvegarde les racines et les schèmes dans les fichiers respectifs."""
-        # Sauvegarde des racines
-        roots_list = self.get_all_roots_data(self.root_tree, [])
-        with open(self.r_path, 'w', encoding='utf-8') as f:
-            for r_obj in roots_list:
-                f.write(r_obj['root'] + '\n')
-        
-        # Sauvegarde des schèmes
-        with open(self.s_path, 'w', encoding='utf-8') as f:
-            for s_name, info in self.schemes.items():
-                f.write(f"{s_name},{info['cat']}\n")
+        self.write_files(*self.snapshot())
+
+    def snapshot(self):
+        """Copie cohérente (racines triées, schèmes) : aucune écriture ne peut s'intercaler."""
+        with self.lock.read():
+            roots = [n.key for n in self._iter_nodes(self.root_tree)]
+            return roots, [(s_name, info['cat']) for s_name, info in self.schemes.items()]
+
+    def write_files(self, roots, schemes):
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='write_files'):
+            # Sauvegarde des racines
+            atomic_write(self.r_path, (r + '\n' for r in roots))
+            # Sauvegarde des schèmes
+            atomic_write(self.s_path, (f"{s_name},{cat}\n" for s_name, cat in schemes))
+            # L'instantané est écrit en dernier pour rester plus récent que les fichiers texte
+            if self.snap_path: write_snapshot(self.snap_path, roots, schemes)
+
+    # --- JOURNAL DES MODIFICATIONS ---
+    def attach_store(self, store):
+        """Branche un journal (persistence.ChangeLog) : les modifications y sont ajoutées au lieu de tout réécrire."""
+        self.store = store
+
+    def _persist(self, op, *args):
+        if self.store: self.store.record(op, *args)
+        else: self.save_data() # Sauvegarde auto
+
+    def apply_change(self, op, *args):
+        """Rejoue une modification du journal, sans la journaliser à nouveau (opérations idempotentes)."""
+        with self.lock.write():
+            if op == 'add_root':
+                self.root_tree = self.insert_root(self.root_tree, args[0])
+            elif op == 'add_roots':
+                self._merge_roots(args)
+            elif op == 'delete_root':
+                self.root_tree = self.delete_root(self.root_tree, args[0])
+                self.frequencies.discard(args[0])
+            elif op == 'add_scheme':
+                self._set_scheme(args[0], args[1] if len(args) > 1 else "")
+            elif op == 'delete_scheme' and args[0] in self.schemes:
+                self._drop_scheme(args[0])
+
+    def _iter_nodes(self, node):
+        """Parcours infixe (ordre alphabétique) sans récursion."""
+        stack = []
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
 
     def get_all_roots_data(self, node, res):
-        if node:
-            self.get_all_roots_data(node.left, res)
-            res.append({"root": node.key, "derivatives": node.derived_words})
-            self.get_all_roots_data(node.right, res)
+        with self.lock.read():
+            for root, derivatives in self._iter_roots_data(node):
+                res.append({"root": root, "derivatives": derivatives})
         return res
+
+    def _iter_roots_data(self, node=MISSING):
+        """(racine, dérivés les plus vérifiés avec leur compte) en ordre alphabétique."""
+        view = self._frequency_view()
+        for n in self._iter_nodes(self.root_tree if node is MISSING else node):
+            yield n.key, view.counts_for(n.key)
+
+    def prefix_range(self, prefix):
+        """Bornes [lo, hi) des racines commençant par prefix."""
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def roots_page(self, offset=0, limit=100, lo=None, hi=None):
+        """Une page des racines de [lo, hi) : O(log n) pour le total et le placement, puis O(limit)."""
+        return {"total": self.count_range(lo, hi), "offset": offset, "limit": limit,
+                "roots": list(self.iter_roots(lo, hi, offset, limit, chunk_size=max(limit, 1)))}
+
+    def iter_roots(self, lo=None, hi=None, offset=0, limit=None, chunk_size=500):
+        """Génère {"root", "derivatives"} pour les racines de [lo, hi), par paquets lus chacun sous verrou.
+
+        Un long flux ne bloque pas les écritures : chaque paquet reprend après la dernière racine envoyée.
+        """
+        def rows(nodes):
+            view = self._frequency_view([nd.key for nd in nodes])
+            return [{"root": nd.key, "derivatives": view.counts_for(nd.key)} for nd in nodes]
+        for chunk in self._node_chunks(lo, hi, offset, limit, chunk_size, rows): yield from chunk
+
+    def export_roots(self, lo=None, hi=None, offset=0, limit=None, chunk_size=4096):
+        """Génère les lignes d'un fichier de racines (format de roots.txt, relu par import_roots), en ordre."""
+        for chunk in self._node_chunks(lo, hi, offset, limit, chunk_size, lambda nodes: [nd.key for nd in nodes]):
+            yield ''.join(key + '\n' for key in chunk)
+
+    def _node_chunks(self, lo, hi, offset, limit, chunk_size, rows):
+        """Paquets rows(noeuds) des racines de [lo, hi), chacun calculé sous verrou de lecture."""
+        last = None
+        while limit is None or limit > 0:
+            n = chunk_size if limit is None else min(chunk_size, limit)
+            with self.lock.read():
+                if last is None: start = (0 if lo is None else self.rank(lo)) + offset
+                else: start = self.rank(last) + (last in self.root_index)
+                nodes = list(islice(takewhile(lambda nd: hi is None or nd.key < hi, self._iter_from(start)), n))
+                chunk = rows(nodes)
+            if not nodes: return
+            yield chunk
+            last = nodes[-1].key
+            if limit is not None: limit -= len(nodes)
+
     def verify_morphology(self, word, root_key):
         """Vérifie si un mot correspond à une racine selon les schèmes connus."""
-        node = self.search_root(self.root_tree, root_key)
-        if not node:
+        schemes = self.verify_schemes(word, root_key)
+        if not schemes:
             return False, None
-            
-        word_clean = self.strip_tashkeel(word)
-        root_clean = self.strip_tashkeel(root_key)
-        
-        for s_name in self.schemes:
-            # On génère le mot théorique avec ce schème
-            generated = self.apply_scheme(root_clean, s_name)
-            if word_clean == self.strip_tashkeel(generated):
-                # Si ça match, on enregistre qu'on a trouvé ce dérivé
-                node.derived_words[word_clean] = node.derived_words.get(word_clean, 0) + 1
-                return True, s_name
-                
-        return False, None
\ No newline at end of file
+        # Si ça match, on enregistre qu'on a trouvé ce dérivé
+        self.record_derivative(root_key, word)
+        return True, schemes[0]
+
+    def record_derivative(self, root_key, word):
+        word = self.strip_tashkeel(word)
+        # Sous verrou : reload() vide puis remplit root_index, sync_frequencies remplace derived_counts
+        with self.lock.read():
+            if root_key in self.root_index: self.derived_counts.add(root_key, word)
+
+    # --- FRÉQUENCES DES DÉRIVÉS ---
+    def _frequency_view(self, roots=None, overall_only=False):
+        """Fichier + comptes non encore synchronisés, fusionnés (seulement les résumés de roots, ou le global, si demandé)."""
+        view = self._new_tracker()
+        view.merge(self.frequencies, roots, overall_only)
+        retired = self.retired_counts
+        if retired: retired.fold(lambda t: view.merge(t, roots, overall_only))
+        self.derived_counts.fold(lambda t: view.merge(t, roots, overall_only))
+        return view
+
+    def top_derivatives(self, k=10, root=None):
+        """Les k dérivés les plus vérifiés, de toutes les racines ou d'une seule.
+
+        Comptes approchés (Space-Saving) : count - error <= fréquence réelle <= count, et error <= max_error = N / m
+        (N vérifications comptées, m capacité du résumé).
+        """
+        with self.lock.read():
+            if root is None:
+                # Le classement global ne lit que les résumés globaux : coût indépendant du nombre de racines
+                view = self._frequency_view(overall_only=True)
+                view.retain(self.root_index)
+                summary = view.overall
+            else:
+                view = self._frequency_view([root])
+                summary = view.roots.get(root)
+            total, capacity = (summary.total, summary.capacity) if summary else (0, self.freq_capacity[1])
+            return {"total": total, "max_error": -(-total // capacity), "results": view.top(k, root)}
+
+    def sync_frequencies(self, final=False):
+        """Ajoute au fichier des fréquences les comptes de ce processus, puis relit ceux de tous les processus.
+
+        À appeler sous le verrou du journal (commun aux processus en mode partagé), après avoir relu le journal :
+        le fichier est filtré sur les racines connues de ce processus. Les copies par thread sont
+        remplacées puis gardées un cycle avant d'être versées au fichier : un thread qui venait de lire
+        l'ancien compteur a fini d'y ajouter. final=True verse tout (arrêt du processus).
+        """
+        if self.freq_path and os.path.exists(self.freq_path):
+            stored = FrequencyTracker.load(self.freq_path, *self.freq_capacity)
+        else:
+            stored = self._new_tracker()
+        with self.lock.write() if final else self.lock.read():
+            # Pas de fichier : l'état « stocké » est celui de la mémoire
+            if not self.freq_path: stored.merge(self.frequencies)
+            pending = [self.retired_counts, self.derived_counts] if final else [self.retired_counts]
+            for counter in pending:
+                if counter: counter.fold(stored.merge)
+            # Racines supprimées, éventuellement par un autre processus
+            stored.retain(self.root_index)
+        if self.freq_path: stored.dump(self.freq_path)
+        # Bascule sous verrou : une lecture voit soit l'ancien état, soit le nouveau, jamais un mélange
+        with self.lock.write():
+            self.frequencies = stored
+            self.retired_counts = None if final else self.derived_counts
+            self.derived_counts = ShardedCounter(self._new_tracker)
+
+    def verify_schemes(self, word, root_key):
+        """Tous les schèmes qui produisent ce mot à partir de cette racine.
+
+        On analyse le mot une seule fois avec l'automate, au lieu de générer chaque schème ; les schèmes dont les
+        lettres radicales concordent sont confirmés par génération (règles des racines faibles).
+        """
+        word_clean, root_clean = self.strip_tashkeel(word), self.strip_tashkeel(root_key)
+        with self.lock.read():
+            if not self.find_root(root_key): return []
+            return self._confirm_schemes(word_clean, root_clean, self._scheme_matches(word_clean, 'verify_schemes'))
+
+    def verify_batch(self, pairs, counts=None):
+        """verify_schemes sur une liste de couples (mot, racine) : mêmes résultats, dans le même ordre.
+
+        Un seul verrou pour tout le lot, et chaque mot distinct n'est analysé qu'une fois par l'automate.
+        counts : nombre de vérifications de chaque couple ; les dérivés confirmés sont alors comptés
+        (comme record_derivative) sous le même verrou.
+        """
+        cleaned = [(self.strip_tashkeel(w), self.strip_tashkeel(r)) for w, r in pairs]
+        matches, found = {}, {}
+        with self.lock.read():
+            for (_, root_key), key in zip(pairs, cleaned):
+                if key in found: continue
+                word_clean, root_clean = key
+                if not self.find_root(root_key):
+                    found[key] = []
+                    continue
+                if word_clean not in matches: matches[word_clean] = list(self._scheme_matches(word_clean, 'verify_batch'))
+                found[key] = self._confirm_schemes(word_clean, root_clean, matches[word_clean])
+            for (word_clean, root_clean), n in zip(cleaned, counts or ()):
+                if found[word_clean, root_clean] and root_clean in self.root_index:
+                    self.derived_counts.add(root_clean, word_clean, n)
+        return [list(found[key]) for key in cleaned]
+
+    def _confirm_schemes(self, word_clean, root_clean, matches):
+        return [s_name for s_name, letters in matches
+                if len(letters) == len(root_clean) and all(l is None or l == r for l, r in zip(letters, root_clean))
+                and self.apply_scheme(root_clean, s_name) == word_clean]
+
+
+def _derive_chunk(results_template, chunk):
+    """Dérive un paquet de racines (entrées de _chunk_entry) en lignes NDJSON."""
+    lines = []
+    for root, known, results in chunk:
+        if known and results is not None:
+            lines.append(json.dumps({"root": root, "results": results}, ensure_ascii=False) + '\n')
+        elif known:
+            root_json = json.dumps(root, ensure_ascii=False)
+            # Les lettres radicales (arabes) n'ont pas besoin d'échappement JSON
+            lines.append('{"root": ' + root_json + ', "results": ' + results_template.format(*root) + '}\n')
+        else:
+            lines.append(json.dumps({"root": root, "error": "الجذر غير موجود في قاعدة البيانات"}, ensure_ascii=False) + '\n')
+    return lines
+
+
+def _edits1(word):
+    """Les mots à au plus une modification de word (lettres arabes), sans doublon."""
+    res = {word}
+    for i in range(len(word) + 1):
+        if i < len(word): res.add(word[:i] + word[i + 1:])
+        for c in ARABIC_LETTERS:
+            res.add(word[:i] + c + word[i:])
+            if i < len(word): res.add(word[:i] + c + word[i + 1:])
+    return res
@@ -0,0 +1,163 @@
+"""Instrumentation du service : histogrammes, compteurs et jauges, exposés au format texte Prometheus.
+
+Le registre global REGISTRY est désactivé par défaut : chaque point de mesure commence par un test de
+REGISTRY.enabled, si bien que le coût est négligeable quand les mesures sont coupées (app.py l'active
+sauf si SARF_METRICS=0).
+"""
+import bisect
+import cProfile
+import heapq
+import io
+import pstats
+import random
+import threading
+import time
+
+# Bornes par défaut des histogrammes de durées (secondes) et de quantités (schèmes, noeuds)
+TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000, 5000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.series = {} # labels (tuple trié) -> [compte par borne..., +Inf, somme]
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            row = self.series.get(labels)
+            if row is None: row = self.series[labels] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {} # nom -> (aide, Histogram)
+        self.counters = {} # nom -> (aide, {labels: valeur})
+        self.gauges = {} # nom -> (aide, fonction appelée à la lecture)
+        self.lock = threading.Lock()
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS):
+        if name not in self.histograms: self.histograms[name] = (help_text, Histogram(buckets))
+
+    def counter(self, name, help_text):
+        if name not in self.counters: self.counters[name] = (help_text, {})
+
+    def gauge(self, name, help_text, fn):
+        self.gauges[name] = (help_text, fn)
+
+    def observe(self, name, value, **labels):
+        if self.enabled: self.histograms[name][1].observe(value, tuple(sorted(labels.items())))
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled: return
+        values, key = self.counters[name][1], tuple(sorted(labels.items()))
+        with self.lock: values[key] = values.get(key, 0) + value
+
+    def timer(self, name, **labels):
+        """Contexte qui mesure sa durée dans l'histogramme name (rien à faire si les mesures sont coupées)."""
+        return _Timer(self, name, labels) if self.enabled else _NULL_TIMER
+
+    def render(self):
+        """Tout le registre au format d'exposition texte de Prometheus."""
+        out = []
+        for name, (help_text, fn) in sorted(self.gauges.items()):
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {fn()}"]
+        for name, (help_text, values) in sorted(self.counters.items()):
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            with self.lock: items = list(values.items())
+            out += [f"{name}{_labels(key)} {value}" for key, value in items]
+        for name, (help_text, hist) in sorted(self.histograms.items()):
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            with hist.lock: series = [(key, list(row)) for key, row in hist.series.items()]
+            for key, row in series:
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ('+Inf',), row):
+                    cumulative += count
+                    out.append(f"{name}_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                out.append(f"{name}_sum{_labels(key)} {row[-1]}")
+                out.append(f"{name}_count{_labels(key)} {cumulative}")
+        return '\n'.join(out) + '\n'
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics, self.name, self.labels = metrics, name, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class _NullTimer:
+    def __enter__(self): pass
+    def __exit__(self, *exc): pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _labels(items):
+    if not items: return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class SlowRequestProfiler:
+    """Profile (cProfile) une fraction des requêtes et garde les keep plus lentes.
+
+    Un seul profil à la fois (cProfile ne supporte pas deux profils actifs) : une requête tirée au sort
+    pendant qu'une autre est profilée ne l'est pas.
+    """
+
+    def __init__(self, rate=0.01, keep=10):
+        self.rate, self.keep = rate, keep
+        self.slowest = [] # tas min : (durée, n°, description, profil)
+        self.busy = threading.Lock()
+        self.seq = 0
+
+    def start(self):
+        """Renvoie un profil démarré, ou None si la requête n'est pas échantillonnée."""
+        if random.random() >= self.rate or not self.busy.acquire(blocking=False): return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop(self, profile, duration, description):
+        profile.disable()
+        try:
+            # Toujours sous self.busy : une seule requête à la fois modifie le tas
+            self.seq += 1
+            entry = (duration, self.seq, description, profile)
+            if len(self.slowest) < self.keep: heapq.heappush(self.slowest, entry)
+            elif duration > self.slowest[0][0]: heapq.heapreplace(self.slowest, entry)
+        finally:
+            self.busy.release()
+
+    def dump(self, top=15):
+        """Texte : les requêtes les plus lentes, chacune avec ses top fonctions par temps cumulé."""
+        out = io.StringIO()
+        for duration, _, description, profile in sorted(self.slowest, reverse=True):
+            out.write(f"=== {description} : {duration * 1000:.1f} ms ===\n")
+            pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+        return out.getvalue()
+
+
+REGISTRY = Metrics()
+REGISTRY.histogram('sarf_request_duration_seconds', "Durée des requêtes HTTP par route")
+REGISTRY.counter('sarf_responses_total', "Réponses HTTP par route et code de statut")
+REGISTRY.histogram('sarf_persistence_duration_seconds', "Durée des opérations de persistance")
+REGISTRY.histogram('sarf_schemes_scanned', "Réalisations de schèmes atteintes dans l'automate par appel", COUNT_BUCKETS)
+REGISTRY.histogram('sarf_tree_nodes_visited', "Noeuds de l'arbre AVL visités par appel", COUNT_BUCKETS)
+REGISTRY.histogram('sarf_batch_size', "Clés distinctes par micro-lot du frontal ASGI", COUNT_BUCKETS)
@@ -0,0 +1,263 @@
+"""Transducteur des schèmes : génération (racine, schème -> mot) et analyse (mot -> schème, racine) sur un même automate.
+
+Chaque schème est compilé en réalisations : suites de jetons, lettres fixes ou positions radicales (ف, ع, ل,
+et le dernier ل devient une quatrième position pour les racines quadrilitères). Les règles des racines faibles
+(WEAK_RULES) ajoutent des réalisations où la lettre radicale est remplacée ou supprimée, sous condition sur la
+racine. Toutes les réalisations de tous les schèmes forment un seul automate à préfixes partagés :
+- l'analyse d'un mot le parcourt lettre par lettre en liant les positions radicales, pour un coût qui dépend
+  de la longueur du mot et non du nombre de schèmes ;
+- la génération écrit les mêmes jetons avec les lettres de la racine (gabarit str.format de la réalisation).
+
+L'automate accepte aussi les formes régulières qu'une règle remplace (قاول pour قول + فاعل) : chaque candidat
+complet de l'analyse est confirmé en le régénérant.
+"""
+import re
+from itertools import product
+
+WEAK = 'وي'
+# Lettre radicale oubliée dans le mot (recherche approchée) : à deviner parmi les racines connues
+OMITTED = '\0'
+
+# Règles des racines faibles : (schèmes concernés, position testée dans le schème, lettres radicales concernées,
+# position réécrite, réalisation ; '' supprime la lettre). La première règle qui s'applique l'emporte.
+WEAK_RULES = (
+    (re.compile('^فعل$'), 1, WEAK, 1, 'ا'), # Concave : قول -> قال, بيع -> باع
+    (re.compile('^فعل$'), 2, 'و', 2, 'ا'), # Défectueux : دعو -> دعا
+    (re.compile('^فعل$'), 2, 'ي', 2, 'ى'), # رمي -> رمى
+    (re.compile('^فاع'), 2, WEAK, 2, 'ئ'), # قول -> قائل, بيع -> بائع
+    (re.compile('^فاعل'), 3, 'و', 3, 'ي'), # Défectueux : دعو -> داعي
+    (re.compile('^مفعول'), 2, WEAK, 3, ''), # قول -> مقول, بيع -> مبيع
+    (re.compile('^مفعول'), 4, WEAK, 3, ''), # دعو -> مدعو, رمي -> مرمي
+    (re.compile('^افتعل'), 1, 'و', 1, ''), # Assimilé : وصل -> اتصل
+)
+
+
+class State:
+    # Comme Node et TrieNode : pas de __dict__, transitions allouées seulement si nécessaire
+    __slots__ = ('chars', 'slots', 'finals', 'lengths')
+
+    def __init__(self):
+        self.chars = None # lettre fixe -> State
+        self.slots = None # position radicale -> State
+        self.finals = None # [(schème, arité, conditions)]
+        self.lengths = 0 # Bit i : un état final est à i lettres (élague les mots de mauvaise longueur)
+
+
+class SchemeTransducer:
+    def __init__(self, rules=WEAK_RULES):
+        self.rules = rules
+        self.start = State()
+        self.realizations = {} # schème -> [(arité, conditions, jetons, gabarit)], par priorité
+        self.order = {} # schème -> rang d'ajout (ordre des résultats de l'analyse)
+        self.weak_letters = frozenset() # Lettres testées par les règles des schèmes présents
+        self.ruled = frozenset() # Schèmes qui ont au moins une réalisation soumise à une règle
+        self._seq = 0
+
+    # --- Compilation ---
+    def compile(self, s_name):
+        """Réalisations d'un schème : règles des racines faibles d'abord, forme régulière en dernier."""
+        res = []
+        for arity in ((3, 4) if s_name.count('ل') > 1 else (3,)):
+            slots = _slots(s_name, arity)
+            tokens = [slots.get(i, char) for i, char in enumerate(s_name)]
+            for pattern, at, letters, target, output in self.rules:
+                if target >= len(s_name) or at not in slots or not pattern.search(s_name): continue
+                variant = list(tokens)
+                if output: variant[target] = output
+                else: del variant[target]
+                res.append((arity, {slots[at]: letters}, tuple(variant), _template(variant)))
+            res.append((arity, {}, tuple(tokens), _template(tokens)))
+        return res
+
+    def add(self, s_name):
+        if s_name in self.realizations: self.remove(s_name)
+        self.realizations[s_name] = reals = self.compile(s_name)
+        self.order[s_name] = self._seq
+        self._seq += 1
+        for arity, conditions, tokens, _ in reals:
+            path = [self.start]
+            for token in tokens:
+                state = path[-1]
+                if isinstance(token, int):
+                    if state.slots is None: state.slots = {}
+                    edges = state.slots
+                else:
+                    if state.chars is None: state.chars = {}
+                    edges = state.chars
+                nxt = edges.get(token)
+                if nxt is None: nxt = edges[token] = State()
+                path.append(nxt)
+            if path[-1].finals is None: path[-1].finals = []
+            path[-1].finals.append((s_name, arity, conditions))
+            for depth, state in enumerate(path): state.lengths |= 1 << (len(tokens) - depth)
+        self._update_rules()
+
+    def remove(self, s_name):
+        reals = self.realizations.pop(s_name, None)
+        if reals is None: return
+        del self.order[s_name]
+        for arity, conditions, tokens, _ in reals:
+            path = [self.start]
+            for token in tokens:
+                edges = path[-1].slots if isinstance(token, int) else path[-1].chars
+                path.append(edges[token])
+            # Deux règles peuvent donner les mêmes jetons (ex. مفعول) : on ne retire que cette réalisation
+            end = path[-1]
+            end.finals.remove((s_name, arity, conditions))
+            if not end.finals: end.finals = None
+            # Recalcul des longueurs de bas en haut, en retirant les états devenus inutiles
+            for depth in range(len(tokens), -1, -1):
+                state = path[depth]
+                state.lengths = 1 if state.finals else 0
+                for edges in (state.chars, state.slots):
+                    for child in (edges or {}).values(): state.lengths |= child.lengths << 1
+                if state.lengths or not depth: continue
+                parent, token = path[depth - 1], tokens[depth - 1]
+                edges = parent.slots if isinstance(token, int) else parent.chars
+                del edges[token]
+                if not edges:
+                    if edges is parent.slots: parent.slots = None
+                    else: parent.chars = None
+        self._update_rules()
+
+    def _update_rules(self):
+        ruled = {s_name: reals for s_name, reals in self.realizations.items() if any(r[1] for r in reals)}
+        self.ruled = frozenset(ruled)
+        self.weak_letters = frozenset(c for reals in ruled.values()
+                                      for _, conditions, _, _ in reals for letters in conditions.values() for c in letters)
+
+    # --- Génération ---
+    def apply(self, root, s_name):
+        """Le dérivé de la racine par le schème, ou None si aucune réalisation n'a son nombre de lettres."""
+        reals = self.realizations.get(s_name)
+        if reals is None: reals = self.compile(s_name)
+        arity = len(root)
+        for r_arity, conditions, _, template in reals:
+            if r_arity != arity: continue
+            if all(root[i] in letters for i, letters in conditions.items()): return template.format(*root)
+        return None
+
+    def is_regular(self, root):
+        """Vrai si aucune règle ne s'applique : la racine suit les gabarits réguliers (moteur NumPy)."""
+        return len(root) == 3 and not self.weak_letters.intersection(root)
+
+    def template(self, s_name):
+        """Gabarit régulier trilitère du schème (ex. فاعل -> '{0}ا{1}{2}')."""
+        for arity, conditions, _, template in self.realizations[s_name]:
+            if arity == 3 and not conditions: return template
+
+    # --- Analyse ---
+    def analyze(self, word):
+        """[(schème, lettres radicales)] des schèmes qui produisent le mot, dans l'ordre d'ajout des schèmes.
+
+        Une lettre vaut None si le schème ne contient pas la position correspondante ; les candidats complets
+        sont confirmés par génération. Renvoie aussi le nombre d'analyses examinées (mesures).
+        """
+        found, examined = {}, 0
+        for (s_name, arity, conditions), bound in self._walk(word):
+            examined += 1
+            options = []
+            for i in range(arity):
+                allowed, letter = conditions.get(i), bound[i]
+                if letter is None: options.append(allowed or (None,))
+                elif allowed is None or letter in allowed: options.append((letter,))
+                else: break
+            else:
+                for letters in product(*options):
+                    if None not in letters and self.apply(''.join(letters), s_name) != word: continue
+                    found[(s_name, letters)] = None
+        res = sorted(found, key=lambda key: self.order[key[0]])
+        return [(s_name, list(letters)) for s_name, letters in res], examined
+
+    def approximate(self, word, k=1):
+        """{(schème, lettres radicales): modifications} des réalisations à au plus k modifications des lettres fixes.
+
+        Produit de l'automate par un automate de Levenshtein : une lettre fixe peut être remplacée, oubliée ou
+        ajoutée dans le mot, pour une modification chacune ; les positions radicales se lient comme dans
+        l'analyse exacte, ou valent OMITTED si la lettre radicale manque dans le mot (une modification).
+        Une position répétée (ل de فعلل pour une racine trilitère) déjà liée peut encore être mal tapée ou
+        oubliée, pour une modification. Candidats non confirmés : l'appelant régénère et mesure la distance réelle.
+        """
+        n, found, seen = len(word), {}, set()
+        stack = [(self.start, 0, (None, None, None, None), 0)]
+        while stack:
+            item = stack.pop()
+            if item in seen: continue
+            seen.add(item)
+            state, pos, bound, cost = item
+            budget, rest = k - cost, n - pos
+            # Un état final doit rester à une distance compatible avec les lettres restantes
+            lo = max(rest - budget, 0)
+            if not state.lengths >> lo & ((1 << (rest + budget - lo + 1)) - 1): continue
+            if pos == n and state.finals:
+                for s_name, arity, conditions in state.finals:
+                    options = [(bound[i],) if bound[i] else conditions.get(i, (None,)) for i in range(arity)]
+                    for letters in product(*options):
+                        key = (s_name, letters)
+                        if cost < found.get(key, k + 1): found[key] = cost
+            if pos < n:
+                char = word[pos]
+                if state.chars:
+                    for c, nxt in state.chars.items():
+                        if c == char: stack.append((nxt, pos + 1, bound, cost))
+                        elif budget: stack.append((nxt, pos + 1, bound, cost + 1)) # Lettre remplacée
+                if state.slots:
+                    for slot, nxt in state.slots.items():
+                        letter = bound[slot]
+                        # Position libre, ou oubliée à sa première occurrence (déjà comptée) : on la lie
+                        if letter is None or letter == OMITTED:
+                            stack.append((nxt, pos + 1, bound[:slot] + (char,) + bound[slot + 1:], cost))
+                        elif letter == char: stack.append((nxt, pos + 1, bound, cost))
+                        elif budget: stack.append((nxt, pos + 1, bound, cost + 1)) # Position répétée mal tapée
+                if budget: stack.append((state, pos + 1, bound, cost + 1)) # Lettre ajoutée dans le mot
+            if budget and state.chars:
+                for nxt in state.chars.values(): stack.append((nxt, pos, bound, cost + 1)) # Lettre oubliée
+            if budget and state.slots:
+                for slot, nxt in state.slots.items():
+                    # Lettre radicale oubliée (ou l'une des occurrences d'une position répétée)
+                    if bound[slot] is None: stack.append((nxt, pos, bound[:slot] + (OMITTED,) + bound[slot + 1:], cost + 1))
+                    else: stack.append((nxt, pos, bound, cost + 1))
+        return found
+
+    def _walk(self, word):
+        """Parcours de l'automate : génère ((schème, arité, conditions), lettres liées) pour chaque état final atteint."""
+        n = len(word)
+        if not self.start.lengths >> n & 1: return
+        stack = [(self.start, 0, (None, None, None, None))]
+        while stack:
+            state, pos, bound = stack.pop()
+            if pos == n:
+                for final in state.finals: yield final, bound
+                continue
+            # On n'empile que les états d'où un état final est à la bonne distance
+            char, rest = word[pos], n - pos - 1
+            if state.chars:
+                nxt = state.chars.get(char)
+                if nxt and nxt.lengths >> rest & 1: stack.append((nxt, pos + 1, bound))
+            if state.slots:
+                for slot, nxt in state.slots.items():
+                    if not nxt.lengths >> rest & 1: continue
+                    letter = bound[slot]
+                    if letter is None: stack.append((nxt, pos + 1, bound[:slot] + (char,) + bound[slot + 1:]))
+                    elif letter == char: stack.append((nxt, pos + 1, bound))
+
+    def stats(self):
+        states, stack = 0, [self.start]
+        while stack:
+            state = stack.pop()
+            states += 1
+            for edges in (state.chars, state.slots):
+                if edges: stack.extend(edges.values())
+        return {"schemes": len(self.realizations), "states": states,
+                "realizations": sum(map(len, self.realizations.values()))}
+
+
+def _slots(s_name, arity):
+    """Position dans le schème -> position radicale ; avec quatre lettres, le dernier ل est la quatrième."""
+    slots = {i: 'فعل'.index(c) for i, c in enumerate(s_name) if c in 'فعل'}
+    if arity == 4: slots[s_name.rindex('ل')] = 3
+    return slots
+
+
+def _template(tokens):
+    return ''.join('{%d}' % t if isinstance(t, int) else t.replace('{', '{{').replace('}', '}}') for t in tokens)
@@ -0,0 +1,251 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError: # Windows : pas de verrou entre processus, mode partagé indisponible
+    fcntl = None
+
+def atomic_write(path, lines):
+    """Écrit dans un fichier temporaire du même dossier puis le renomme : le fichier n'est jamais à moitié écrit."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ProcessLock:
+    """Verrou réentrant entre threads et, si flock est disponible, entre processus (fichier .lock dédié)."""
+
+    def __init__(self, path=None):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644) if path and fcntl else None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1 and self._fd is not None: fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None: fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+class ChangeLog:
+    """Persistance différée : journal append-only des modifications, vidé par un thread en arrière-plan.
+
+    Chaque modification (racine ou schème) devient une ligne du journal, un tableau JSON [op, args...] (les
+    valeurs ne peuvent donc pas y ajouter de lignes ou d'opérations) ; la requête ne fait que la mettre en
+    file d'attente. Le thread écrit les lignes par lots, fait un fsync au plus toutes les fsync_interval
+    secondes et, toutes les compact_every modifications, réécrit roots.txt / schemes.txt (fichier temporaire
+    + renommage) puis remplace le journal par un journal vide. Au démarrage, le journal existant est rejoué
+    puis compacté.
+
+    Avec shared=True, plusieurs processus (workers gunicorn, etc.) partagent le même journal : les ajouts et
+    la compaction se font sous un verrou flock, et sync() applique les lignes écrites par les autres processus
+    (les opérations étant idempotentes, relire ses propres lignes est sans effet). Chaque compaction incrémente
+    la génération notée en tête du journal ; un processus en retard de plus d'une génération recharge les fichiers.
+
+    Toutes les frequency_interval secondes (et à l'arrêt), les fréquences des dérivés comptées par ce processus
+    sont versées dans le fichier des fréquences, sous le même verrou (SARF_Logic.sync_frequencies).
+    """
+
+    def __init__(self, logic, log_path='data/changes.log', batch_size=256, flush_interval=0.2,
+                 fsync_interval=1.0, compact_every=10_000, shared=False, frequency_interval=5.0):
+        if shared and not fcntl: raise RuntimeError("le journal partagé entre processus nécessite fcntl.flock")
+        self.logic = logic
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.frequency_interval = frequency_interval
+        self.shared = shared
+        # Verrou du fichier journal ; entre processus seulement en mode partagé
+        self.lock = ProcessLock(f"{log_path}.lock" if shared else None)
+        self._queue = queue.Queue()
+        self._file = None
+        self._reader = None
+        self._read_offset = 0
+        self._generation = 0
+        self._read_lock = threading.Lock()
+        self._last_fsync = self._last_frequency_sync = time.monotonic()
+        self._since_compact = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Cycle de vie ---
+    def replay(self):
+        """Rejoue le journal existant sur l'état chargé depuis les fichiers texte ; renvoie le nombre de modifications."""
+        if not os.path.exists(self.log_path): open(self.log_path, 'ab').close()
+        self._open_reader()
+        count = self._read_new()
+        self._since_compact = count
+        return count
+
+    def start(self):
+        if self._reader is None: self.replay()
+        self._file = open(self.log_path, 'ab')
+        if self._since_compact: self.compact()
+        self._thread = threading.Thread(target=self._run, name='sarf-changelog', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Arrêt propre : vide la file et synchronise le journal sur disque (sans compaction)."""
+        if not self._thread: return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with self.lock:
+            self._write_pending()
+            self._fsync()
+            self._file.close()
+            if self.shared: self.sync()
+            self.logic.sync_frequencies(final=True)
+        self._reader.close()
+
+    # --- Écriture ---
+    def record(self, op, *args):
+        """Appelé par SARF_Logic à chaque modification : coût constant, indépendant de la taille du lexique."""
+        self._queue.put((json.dumps([op, *map(str, args)], ensure_ascii=False) + '\n').encode('utf-8'))
+
+    def flush(self):
+        """Écrit immédiatement tout ce qui est en attente et fait un fsync."""
+        with self.lock:
+            self._write_pending()
+            self._fsync()
+
+    def _drain(self, first=None):
+        lines = [first] if first else []
+        while len(lines) < self.batch_size:
+            try: lines.append(self._queue.get_nowait())
+            except queue.Empty: break
+        return lines
+
+    def _write_pending(self):
+        while True:
+            lines = self._drain()
+            if not lines: return
+            self._write(lines)
+
+    def _write(self, lines):
+        if not lines: return
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='log_append'):
+            # Un autre processus a pu compacter (et remplacer) le journal : on écrit dans le nouveau fichier
+            if self.shared and os.stat(self.log_path).st_ino != os.fstat(self._file.fileno()).st_ino:
+                self._file.close()
+                self._file = open(self.log_path, 'ab')
+            self._file.writelines(lines)
+            self._file.flush()
+        self._since_compact += len(lines)
+
+    def _fsync(self):
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='fsync'):
+            os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty: first = None
+            with self.lock:
+                self._write(self._drain(first))
+                if time.monotonic() - self._last_fsync >= self.fsync_interval: self._fsync()
+            if self.shared: self.sync()
+            if self._since_compact >= self.compact_every: self.compact()
+            if time.monotonic() - self._last_frequency_sync >= self.frequency_interval: self.sync_frequencies()
+
+    def sync_frequencies(self):
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='sync_frequencies'), self.lock:
+            # Le fichier est filtré sur les racines connues : elles doivent inclure celles des autres processus
+            # (journal relu sous ce même verrou) et nos ajouts doivent y être écrits avant nos comptes
+            self._write_pending()
+            if self.shared: self.sync()
+            self.logic.sync_frequencies()
+        self._last_frequency_sync = time.monotonic()
+
+    # --- Lecture (mode partagé) ---
+    def sync(self):
+        """Applique les lignes ajoutées au journal depuis la dernière lecture, y compris après une compaction."""
+        with self._read_lock:
+            if os.fstat(self._reader.fileno()).st_size > self._read_offset: self._read_new()
+            if not self._rotated(): return
+        # Journal remplacé par une compaction : on bascule sous le verrou (les fichiers ne bougent plus)
+        with self.lock, self._read_lock:
+            if not self._rotated(): return
+            # L'ancien fichier est complet : on le finit
+            self._read_new()
+            generation = self._generation
+            self._reader.close()
+            self._open_reader()
+            if self._generation != generation + 1:
+                # Plusieurs compactions manquées : leurs lignes ne sont plus que dans les fichiers texte
+                self.logic.reload()
+            self._read_new()
+
+    def _rotated(self):
+        return os.stat(self.log_path).st_ino != os.fstat(self._reader.fileno()).st_ino
+
+    def _open_reader(self):
+        """Ouvre le journal courant et lit sa génération (ligne d'en-tête « #gen N », absente = 0)."""
+        self._reader = open(self.log_path, 'rb')
+        header = self._reader.readline()
+        if header.startswith(b'#gen\t'):
+            self._generation, self._read_offset = int(header[5:]), len(header)
+        else:
+            self._generation, self._read_offset = 0, 0
+
+    def _read_new(self):
+        self._reader.seek(self._read_offset)
+        data = self._reader.read()
+        # Une dernière ligne incomplète (écriture en cours ou arrêt brutal) sera lue plus tard
+        end = data.rfind(b'\n') + 1
+        count = 0
+        for line in data[:end].decode('utf-8').split('\n')[:-1]:
+            # Journaux d'avant l'encodage JSON : champs séparés par des tabulations
+            op, *args = json.loads(line) if line.startswith('[') else line.split('\t')
+            self.logic.apply_change(op, *args)
+            count += 1
+        self._read_offset += end
+        return count
+
+    # --- Compaction ---
+    def compact(self):
+        """Réécrit les fichiers texte à partir de l'état courant puis retire du journal ce qu'ils contiennent."""
+        with REGISTRY.timer('sarf_persistence_duration_seconds', op='compact'), self.lock:
+            if self.shared:
+                # Personne d'autre ne peut écrire : on relit tout le journal (nos lignes comprises) dans son ordre,
+                # pour que l'état compacté soit exactement celui décrit par le journal
+                self._write_pending()
+                self.sync()
+            with self.logic.lock.read():
+                # Tout ce qui est en file d'attente est déjà appliqué en mémoire : on l'écrit avant de figer l'état
+                data = self.logic.snapshot()
+                self._write_pending()
+                offset = self._file.tell()
+            self.logic.write_files(*data)
+
+            # Les lignes ajoutées pendant l'écriture des fichiers ne sont pas dans l'instantané : on les garde
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read()
+            self._file.close()
+            atomic_write(self.log_path, [f"#gen\t{self._generation + 1}\n", tail.decode('utf-8')])
+            self._file = open(self.log_path, 'ab')
+            self._since_compact = tail.count(b'\n')
+            with self._read_lock:
+                self._reader.close()
+                self._open_reader()
+                # Ces lignes sont déjà appliquées en mémoire
+                self._read_offset += len(tail)
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+# Modules du projet à plat (logic.py, persistence.py...) : importables depuis les tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.lexicon import write_lexicon
+from logic import SARF_Logic
+from persistence import ChangeLog
+
+ROOTS = ['درس', 'علم', 'قول', 'كتب', 'دحرج']
+SCHEMES = [('فعل', 'verbe'), ('فاعل', 'nom'), ('مفعول', 'nom'), ('فعلل', 'verbe')]
+
+
+@pytest.fixture(scope='session')
+def sarf_app(tmp_path_factory):
+    """Module asgi (et app.py, qu'il importe) chargé sur le petit lexique, dans un dossier temporaire.
+
+    app.py lit et écrit data/ relativement au dossier courant : on y reste jusqu'à la fermeture du journal.
+    """
+    tmp, cwd = tmp_path_factory.mktemp('app'), os.getcwd()
+    write_lexicon(str(tmp / 'data'), ROOTS, SCHEMES)
+    os.chdir(tmp)
+    try:
+        import asgi
+        yield asgi
+        asgi.changelog.close()
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def lexicon(tmp_path):
+    """Chemins (roots.txt, schemes.txt) d'un petit lexique dans un dossier temporaire."""
+    return write_lexicon(str(tmp_path), ROOTS, SCHEMES)
+
+
+@pytest.fixture
+def open_store(tmp_path, lexicon):
+    """Charge le lexique et démarre un journal ; appeler à nouveau simule un redémarrage."""
+    stores = []
+
+    def start(run=True, **kwargs):
+        """run=False : journal rejoué mais sans thread d'écriture (synchronisations appelées par le test)."""
+        logic = SARF_Logic()
+        store = ChangeLog(logic, str(tmp_path / 'changes.log'), flush_interval=0.01, **kwargs)
+        with store.lock:
+            logic.load_data(*lexicon, freq_path=str(tmp_path / 'frequencies.json'))
+            store.replay()
+        logic.attach_store(store.start() if run else store)
+        stores.append(store)
+        return logic, store
+
+    yield start
+    for store in stores: store.close()
@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.fixture
+def client(sarf_app):
+    return sarf_app.flask_app.test_client()
+
+
+def test_suggest_k_is_parsed_and_clamped(client):
+    everything = client.get('/suggest?q=م&k=100').json["results"]
+    assert len(everything) > 1
+    assert client.get('/suggest?q=م&k=abc').json["results"] == everything[:10]
+    assert client.get('/suggest?q=م&k=0').json["results"] == everything[:1]
+    assert client.get('/suggest?q=م&k=-5').json["results"] == everything[:1]
+
+
+def test_analyze_text_rejects_non_string_text(client):
+    for text in (['كاتب'], 3, {"a": 1}):
+        assert client.post('/analyze_text', json={"text": text}).status_code == 400
+    lines = client.post('/analyze_text', json={"text": 'كاتب مكتوب كاتب'}).data.decode('utf-8').splitlines()
+    assert len(lines) == 2
+
+
+def test_roots_import_requires_a_list_of_strings(client, sarf_app):
+    for roots in ([1], 'نصر', ['نصر', None], {"نصر": 1}):
+        assert client.post('/roots/import', json={"roots": roots}).status_code == 400
+    assert 'نصر' not in sarf_app.logic.root_index
+    res = client.post('/roots/import', json={"roots": ['نصر', 'كتب', 'abc']}).json
+    assert (res["added"], res["duplicates"], res["invalid"]) == (1, 1, 1)
+    assert client.post('/manage', json={"root": 'نصر', "action": 'delete'}).status_code == 200
+
+
+def test_identify_words_requires_a_list_of_strings(client):
+    for words in ('كاتب', ['كاتب', 3], [None], {"كاتب": 1}):
+        assert client.post('/identify', json={"words": words}).status_code == 400
+    res = client.post('/identify', json={"words": ['كاتب', 'ثثث']}).json["results"]
+    assert res == [[{"root": 'كتب', "scheme": 'فاعل', "word": 'كاتب'}], []]
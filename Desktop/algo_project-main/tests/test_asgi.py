@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+
+
+async def request(frontend, path, payload):
+    """(code, corps) d'un POST JSON envoyé directement à l'application ASGI."""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+             'path': path, 'root_path': '', 'query_string': b'', 'server': ('test', 80), 'client': ('127.0.0.1', 0),
+             'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]}
+    messages, status, chunks = [{'type': 'http.request', 'body': body, 'more_body': False}], [], []
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start': status.append(message['status'])
+        else: chunks.append(message.get('body', b''))
+
+    await frontend(scope, receive, send)
+    return status[0], b''.join(chunks)
+
+
+def frontends(sarf_app, window=0.05):
+    return (sarf_app.BatchingFrontend(sarf_app.flask_app, window=window, batching=True),
+            sarf_app.BatchingFrontend(sarf_app.flask_app, window=window, batching=False))
+
+
+CALLS = [('/verify', {"word": 'كاتب', "root": 'كتب'})] * 3 + [
+    ('/verify', {"word": 'عالم', "root": 'علم'}), ('/verify', {"word": 'كاتب', "root": 'علم'}),
+    ('/identify', {"word": 'مكتوب'}), ('/identify', {"word": 'مكتوب'}), ('/identify', {"word": 'دارس'}),
+    ('/identify', {"word": 'كاتبث'}), ('/identify', {"word": 'ثثثثثث'})]
+
+
+def test_batches_coalesce_dedup_and_match_flask(sarf_app):
+    batched, bridged = frontends(sarf_app)
+    counted = lambda: sarf_app.logic.top_derivatives(10, 'كتب')["total"]
+
+    async def run(frontend):
+        return await asyncio.gather(*(request(frontend, path, payload) for path, payload in CALLS))
+    before = counted()
+    got = asyncio.run(run(batched))
+    # Un lot par route, chaque clé distincte une seule fois
+    assert (batched.verify.calls, batched.verify.batches, batched.verify.keys) == (5, 1, 3)
+    assert (batched.identify.calls, batched.identify.batches, batched.identify.keys) == (5, 1, 4)
+    # Chaque appelant compte, même quand le lot ne contient sa clé qu'une fois
+    assert counted() == before + 3
+    expected = asyncio.run(run(bridged))
+    assert got == expected
+    client = sarf_app.flask_app.test_client()
+    assert [(r.status_code, r.data) for r in (client.post(path, json=payload) for path, payload in CALLS)] == expected
+    assert [status for status, _ in got] == [200] * 9 + [404]
+    for frontend in (batched, bridged):
+        frontend.wsgi_pool.shutdown()
+        frontend.batch_pool.shutdown()
+
+
+def test_verify_never_blocks_the_event_loop_on_the_logic_lock(sarf_app, monkeypatch):
+    batched, _ = frontends(sarf_app, window=0.001)
+    logic, verify_batch = sarf_app.logic, sarf_app.logic.verify_batch
+
+    def writer(locked):
+        with logic.lock.write():
+            locked.set()
+            time.sleep(0.3)
+
+    def verify_then_write(*args):
+        # Un rédacteur prend le verrou dès la fin du lot, avant que la boucle ne construise la réponse
+        res, locked = verify_batch(*args), threading.Event()
+        threading.Thread(target=writer, args=(locked,)).start()
+        assert locked.wait(5)
+        return res
+    monkeypatch.setattr(logic, 'verify_batch', verify_then_write)
+
+    async def run():
+        ticks = [time.perf_counter()]
+        verify = asyncio.ensure_future(request(batched, '/verify', {"word": 'كاتب', "root": 'كتب'}))
+        while not verify.done():
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+        return ticks + [time.perf_counter()], verify.result()
+
+    ticks, (status, _) = asyncio.run(run())
+    assert status == 200
+    # Réponse envoyée et boucle libre pendant que le rédacteur tient encore le verrou (0,3 s)
+    assert ticks[-1] - ticks[0] < 0.2
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+    with logic.lock.read(): pass
+    batched.wsgi_pool.shutdown()
+    batched.batch_pool.shutdown()
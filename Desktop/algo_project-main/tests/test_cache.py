@@ -0,0 +1,17 @@
+def test_verify_and_fuzzy_identify_use_the_apply_scheme_cache(open_store):
+    logic, _ = open_store()
+    assert logic.verify_schemes('كاتب', 'كتب') == ['فاعل']
+    assert logic.verify_schemes('كاتب', 'كتب') == ['فاعل']
+    assert logic.identify_fuzzy('كاتبث', 1)
+    stats = logic.cache_stats()["apply_scheme"]
+    assert stats["hits"] >= 1 and stats["misses"] >= 1 and stats["size"] >= 1
+
+
+def test_scheme_changes_invalidate_cached_applications(open_store):
+    logic, _ = open_store()
+    assert logic.verify_schemes('كاتب', 'كتب') == ['فاعل']
+    logic.delete_scheme('فاعل')
+    assert all(key[1] != 'فاعل' for key in logic.apply_cache._data)
+    assert logic.verify_schemes('كاتب', 'كتب') == []
+    logic.add_scheme('فاعل', 'nom')
+    assert logic.verify_schemes('كاتب', 'كتب') == ['فاعل']
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from conftest import ROOTS
+
+
+def test_record_during_reload_is_counted(open_store):
+    logic, _ = open_store()
+    loading, load_text = threading.Event(), logic._load_text
+
+    def slow_load_text():
+        # reload() tient le verrou d'écriture avec un index vide pendant le chargement
+        loading.set()
+        time.sleep(0.2)
+        load_text()
+    logic._load_text = slow_load_text
+    reload = threading.Thread(target=logic.reload)
+    reload.start()
+    assert loading.wait(5)
+    logic.record_derivative('كتب', 'كاتب')
+    reload.join()
+    assert logic.top_derivatives(5, 'كتب')["total"] == 1
+
+
+def test_concurrent_readers_and_writers(open_store):
+    logic, _ = open_store()
+    errors, stop = [], threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                assert logic.identify_word('كاتب') == [{"root": 'كتب', "scheme": 'فاعل', "word": 'كاتب'}]
+                logic.record_derivative('كتب', 'كاتب')
+        except Exception as e: errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads: t.start()
+    for i in range(200):
+        root = 'نص' + 'رب'[i % 2]
+        logic.add_root(root) if i % 4 < 2 else logic.remove_root(root)
+    stop.set()
+    for t in threads: t.join()
+    assert not errors
+    assert sorted(logic.root_index) == sorted(ROOTS)
+    assert [n.key for n in logic._iter_nodes(logic.root_tree)] == sorted(ROOTS)
@@ -0,0 +1,115 @@
+import json
+import random
+from collections import Counter
+
+from frequency import FrequencyTracker, SpaceSaving
+
+
+def stored_counts(tmp_path, root):
+    with open(tmp_path / 'frequencies.json', encoding='utf-8') as f: data = json.load(f)
+    return {item: c for item, c, _ in data["roots"].get(root, {"items": []})["items"]}
+
+
+def test_sync_keeps_counts_of_roots_added_by_another_worker(open_store, tmp_path):
+    # A n'a pas encore relu le journal quand il synchronise ses fréquences
+    a, a_store = open_store(run=False, shared=True)
+    b, b_store = open_store(shared=True)
+    assert b.add_root('نصر')
+    for _ in range(5): b.record_derivative('نصر', 'ناصر')
+    b_store.close()
+    assert stored_counts(tmp_path, 'نصر') == {'ناصر': 5}
+    a_store.sync_frequencies()
+    assert 'نصر' in a.root_index
+    assert stored_counts(tmp_path, 'نصر') == {'ناصر': 5}
+    assert a.top_derivatives(5, 'نصر')["results"][0]["count"] == 5
+
+
+def test_sync_drops_deleted_roots(open_store, tmp_path):
+    logic, store = open_store()
+    logic.record_derivative('كتب', 'كاتب')
+    store.close()
+    assert stored_counts(tmp_path, 'كتب') == {'كاتب': 1}
+    logic, store = open_store()
+    assert logic.remove_root('كتب')
+    store.close()
+    assert FrequencyTracker.load(str(tmp_path / 'frequencies.json')).counts_for('كتب') == {}
+
+
+def assert_bounds(summary, truth):
+    for item, (count, error) in summary.counts.items():
+        assert count - error <= truth[item] <= count, (item, count, error, truth[item])
+    # Élément absent : au plus min_count(), et toute erreur reste <= N / m
+    for item, n in truth.items():
+        if item not in summary.counts: assert n <= summary.min_count(), (item, n)
+    assert all(e <= summary.total / summary.capacity for _, e in summary.counts.values())
+
+
+def test_evicted_heavy_hitter_keeps_its_error_after_discard():
+    summary, truth = SpaceSaving(2), Counter()
+    for item, n in ((('كتب', 'كاتب'), 50), (('علم', 'عالم'), 60), (('درس', 'دارس'), 70)):
+        for _ in range(n):
+            summary.add(item)
+            truth[item] += 1
+    assert ('كتب', 'كاتب') not in summary.counts
+    summary.discard(lambda item: item[0] == 'درس')
+    del truth[('درس', 'دارس')]
+    summary.add(('كتب', 'كاتب'))
+    truth[('كتب', 'كاتب')] += 1
+    assert_bounds(summary, truth)
+
+
+def test_bounds_hold_under_random_adds_discards_and_merges():
+    rnd = random.Random(4)
+    for _ in range(200):
+        capacity = rnd.randint(1, 6)
+        parts, truth = [SpaceSaving(capacity) for _ in range(3)], Counter()
+        for _ in range(rnd.randint(0, 300)):
+            # Loi de Zipf approchée : quelques éléments fréquents, beaucoup de rares
+            item = min(int(rnd.paretovariate(1.2)), 30)
+            if rnd.random() < 0.02:
+                # Racine supprimée : ses comptes sont oubliés partout
+                for part in parts: part.discard(lambda x, item=item: x == item)
+                truth.pop(item, None)
+                continue
+            rnd.choice(parts).add(item)
+            truth[item] += 1
+        merged = SpaceSaving(capacity)
+        for part in parts: merged.merge(part)
+        assert_bounds(merged, truth)
+        # Aller-retour par le fichier
+        assert_bounds(SpaceSaving.from_dict(json.loads(json.dumps(merged.to_dict()))), truth)
+
+
+def test_top_derivatives_bounds_hold_across_restarts(open_store):
+    # 40 mots pour un résumé de 16 par racine : des mots sont évincés, comptes et erreurs relus depuis le fichier
+    rnd, truth = random.Random(7), Counter()
+    for _ in range(3):
+        logic, store = open_store()
+        for _ in range(400):
+            word = 'كتب' + str(min(int(rnd.paretovariate(1.1)), 40))
+            logic.record_derivative('كتب', word)
+            truth[word] += 1
+        store.close()
+    logic, _ = open_store()
+    top = logic.top_derivatives(100, 'كتب')
+    assert top["total"] == sum(truth.values()) and len(top["results"]) == 16
+    for r in top["results"]:
+        assert r["count"] - r["error"] <= truth[r["word"]] <= r["count"] and r["error"] <= top["max_error"]
+    listed = {r["word"] for r in top["results"]}
+    assert all(n <= top["max_error"] for word, n in truth.items() if word not in listed)
+
+
+def test_global_top_merges_only_overall_summaries(open_store):
+    logic, store = open_store()
+    for root, word, n in (('كتب', 'كاتب', 5), ('علم', 'عالم', 3), ('درس', 'دارس', 4)):
+        for _ in range(n): logic.record_derivative(root, word)
+    store.sync_frequencies()
+    logic.record_derivative('علم', 'عالم')
+    assert logic.remove_root('درس')
+    views, frequency_view = [], logic._frequency_view
+    logic._frequency_view = lambda *a, **kw: views.append(frequency_view(*a, **kw)) or views[-1]
+    top = logic.top_derivatives(10)
+    # Fichier, copies retirées et copies des threads : aucun résumé par racine n'est fusionné
+    assert len(views) == 1 and views[0].roots == {}
+    assert [(r["root"], r["word"], r["count"]) for r in top["results"]] == [('كتب', 'كاتب', 5), ('علم', 'عالم', 4)]
+    assert logic.top_derivatives(10, 'علم')["results"][0]["count"] == 4
@@ -0,0 +1,46 @@
+from trie import levenshtein
+
+
+def brute_force(logic, word, k):
+    """{(racine, schème): distance} de toutes les analyses dont le dérivé est à au plus k modifications de word."""
+    res = {}
+    for root in logic.root_index:
+        for s_name in logic.schemes:
+            derived = logic.apply_scheme(root, s_name)
+            if derived is not None and levenshtein(derived, word) <= k: res[(root, s_name)] = levenshtein(derived, word)
+    return res
+
+
+def typos(word):
+    """Toutes les fautes à une modification de word : lettre remplacée, oubliée ou ajoutée."""
+    for i in range(len(word) + 1):
+        yield word[:i] + 'ث' + word[i:]
+        if i < len(word):
+            yield word[:i] + word[i + 1:]
+            yield word[:i] + 'ث' + word[i + 1:]
+
+
+def test_identify_fuzzy_matches_brute_force(open_store):
+    logic, _ = open_store()
+    words = {logic.apply_scheme(r, s) for r in logic.root_index for s in logic.schemes} - {None}
+    for word in sorted(words):
+        for typo in typos(word):
+            got = {(r["root"], r["scheme"]): r["distance"] for r in logic.identify_fuzzy(typo, 1, limit=10 ** 6)}
+            assert got == brute_force(logic, typo, 1), typo
+
+
+def test_identify_fuzzy_repeated_slot(open_store):
+    # فعلل sur une racine trilitère : درسس, le ل répété peut être oublié ou mal tapé
+    logic, _ = open_store()
+    for typo in ('درس', 'درسب', 'درسسس'):
+        assert {"root": 'درس', "scheme": 'فعلل', "word": 'درسس', "distance": 1} in logic.identify_fuzzy(typo, 1)
+
+
+def test_identify_fuzzy_distance_is_clamped(open_store):
+    logic, _ = open_store()
+    assert logic.identify_fuzzy('كاتبث', -3) == logic.identify_fuzzy('كاتبث', 0) == []
+    assert logic.identify_fuzzy('كاتبثث', 9) == logic.identify_fuzzy('كاتبثث', 2)
+    # Au-delà de k=1, deux fautes dont une au plus dans les lettres radicales
+    assert {"root": 'كتب', "scheme": 'فاعل', "word": 'كاتب', "distance": 2} in logic.identify_fuzzy('كاتبثث', 2)
+    for r in logic.identify_fuzzy('ثكاتب', 2, limit=100):
+        assert levenshtein(r["word"], 'ثكاتب') == r["distance"] <= 2
@@ -0,0 +1,22 @@
+import json
+
+from conftest import ROOTS
+
+
+def test_generate_batch_matches_generate_derivatives(open_store):
+    logic, _ = open_store()
+    lines = [json.loads(line) for line in logic.generate_batch(ROOTS + ['زلزل'], chunk_size=2)]
+    assert [line["root"] for line in lines] == ROOTS + ['زلزل']
+    for line, root in zip(lines, ROOTS):
+        assert line["results"] == [{"scheme": s, "word": w} for s, w in logic.generate_derivatives(root)]
+    assert "error" in lines[-1]
+
+
+def test_generate_batch_streams_chunk_by_chunk(open_store):
+    logic, _ = open_store()
+    derived = []
+    entry = logic._chunk_entry
+    logic._chunk_entry = lambda root: derived.append(root) or entry(root)
+    first = next(logic.generate_batch(None, chunk_size=1))
+    assert json.loads(first)["root"] == min(ROOTS)
+    assert len(derived) == 1
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from bench.lexicon import make_roots, make_schemes
+from conftest import ROOTS
+from snapshot import read_snapshot, write_snapshot
+
+
+def test_record_values_cannot_inject_operations(open_store):
+    logic, store = open_store()
+    # Tabulations et sauts de ligne dans une valeur : une seule opération, rejouée telle quelle
+    store.record('add_scheme', 'فعال', 'nom\ndelete_root\tكتب')
+    store.close()
+    logic, _ = open_store()
+    assert 'كتب' in logic.root_index
+    assert logic.schemes['فعال'] == {"cat": 'nom\ndelete_root\tكتب'}
+
+
+def test_scheme_category_round_trips_through_replay_and_compaction(open_store):
+    logic, store = open_store()
+    assert logic.add_scheme('فعال', 'nom\tpluriel, forme 1')
+    store.close()
+    logic, store = open_store()
+    assert logic.schemes['فعال'] == {"cat": 'nom\tpluriel, forme 1'}
+    # Réécriture de schemes.txt puis rechargement sans journal
+    store.compact()
+    store.close()
+    logic, _ = open_store()
+    assert logic.schemes['فعال'] == {"cat": 'nom\tpluriel, forme 1'}
+    assert 'كتب' in logic.root_index
+
+
+def test_add_scheme_rejects_separators(open_store):
+    logic, _ = open_store()
+    for name, cat in (('فعال', 'nom\ndelete_root\tكتب'), ('فع,ال', 'nom'), ('فعال\n', 'nom')):
+        assert not logic.is_valid_scheme(name, cat)
+        with pytest.raises(ValueError): logic.add_scheme(name, cat)
+    assert 'فعال' not in logic.schemes
+
+
+def test_legacy_tab_separated_journal_is_replayed(open_store, tmp_path):
+    (tmp_path / 'changes.log').write_text('add_root\tنصر\ndelete_root\tكتب\n', encoding='utf-8')
+    logic, _ = open_store()
+    assert 'نصر' in logic.root_index and 'كتب' not in logic.root_index
+
+
+def state(logic):
+    return sorted(logic.root_index), dict(logic.schemes)
+
+
+def test_random_changes_survive_replay_and_compaction(open_store, tmp_path):
+    rnd = random.Random(2)
+    logic, store = open_store()
+    roots, schemes = make_roots(60), [s for s, _ in make_schemes(20)]
+    for _ in range(300):
+        op, scheme = rnd.random(), rnd.choice(schemes)
+        if op < 0.4: logic.add_root(rnd.choice(roots))
+        elif op < 0.7: logic.remove_root(rnd.choice(roots + ROOTS))
+        elif op < 0.8: logic.import_roots(rnd.sample(roots, 5) + ['abc'])
+        elif scheme not in logic.schemes: logic.add_scheme(scheme, 'nom')
+        else: logic.delete_scheme(scheme)
+    expected = state(logic)
+    store.close()
+    # Redémarrage : fichiers texte d'origine + journal rejoué
+    logic, store = open_store(run=False)
+    assert state(logic) == expected
+    # Compaction : fichiers réécrits, journal réduit à son en-tête, même état au redémarrage
+    store.start()
+    assert [line for line in (tmp_path / 'changes.log').read_text(encoding='utf-8').splitlines()
+            if not line.startswith('#')] == []
+    store.close()
+    logic, _ = open_store()
+    assert state(logic) == expected
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'lexicon.snap')
+    for roots in (sorted(ROOTS[:4]), sorted(ROOTS)):
+        schemes = [('فعل', 'verbe'), ('فعلل', 'nom, quadrilitère')]
+        write_snapshot(path, roots, schemes, {'كتب': {'كاتب': 3}, 'زلزل': {'زلزال': 1}})
+        assert read_snapshot(path) == (roots, schemes, {'كتب': {'كاتب': 3}})
@@ -0,0 +1,53 @@
+import random
+
+from bench.lexicon import make_roots, make_schemes
+from morphology import SchemeTransducer
+
+SCHEMES = ['فعل', 'فاعل', 'مفعول', 'افتعل', 'فعلل', 'تفعلل', 'فاعلة']
+# Racines faibles (قول, دعو...), quadrilitères et à lettre répétée
+ROOTS = ['قول', 'بيع', 'دعو', 'رمي', 'وصل', 'وعد', 'دحرج', 'زلزل', 'درس', 'مدد']
+
+
+def generations(transducer, roots, schemes):
+    """{mot: {(schème, lettres)}} de toutes les générations racine x schème, par force brute."""
+    res = {}
+    for r in roots:
+        for s in schemes:
+            word = transducer.apply(r, s)
+            if word is not None: res.setdefault(word, set()).add((s, tuple(r)))
+    return res
+
+
+def test_analysis_matches_brute_force_generation():
+    roots = ROOTS + make_roots(150)
+    schemes = SCHEMES + [s for s, _ in make_schemes(60)]
+    transducer = SchemeTransducer()
+    for s in schemes: transducer.add(s)
+    words = generations(transducer, roots, schemes)
+    assert {'قائل', 'مقول', 'دعا', 'اتصل', 'دحرج', 'زلزل'} <= set(words)
+    for word, expected in words.items():
+        found = transducer.analyze(word)[0]
+        # Toute génération est retrouvée ; toute analyse complète régénère le mot
+        assert expected <= {(s, tuple(letters)) for s, letters in found if None not in letters}, word
+        for s, letters in found:
+            if None not in letters: assert transducer.apply(''.join(letters), s) == word, (word, s, letters)
+
+
+def test_incremental_recompilation_matches_fresh_compilation():
+    rnd = random.Random(5)
+    schemes = SCHEMES + [s for s, _ in make_schemes(100)]
+    transducer, live = SchemeTransducer(), []
+    for _ in range(400):
+        if live and rnd.random() < 0.4: transducer.remove(live.pop(rnd.randrange(len(live))))
+        else:
+            s = rnd.choice(schemes)
+            if s not in live:
+                live.append(s)
+                transducer.add(s)
+    fresh = SchemeTransducer()
+    for s in sorted(live, key=transducer.order.get): fresh.add(s)
+    assert transducer.stats() == fresh.stats()
+    for r in ROOTS:
+        for s in live:
+            word = transducer.apply(r, s)
+            if word is not None: assert transducer.analyze(word)[0] == fresh.analyze(word)[0], word
@@ -0,0 +1,94 @@
+import random
+import sys
+import threading
+
+import pytest
+
+import logic as logic_module
+from trie import DerivativeTrie, levenshtein
+
+
+def walk(trie):
+    """(noeuds, octets) par parcours complet : ce que stats() tient à jour sans parcourir."""
+    nodes, size, stack = 0, 0, [trie.root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        size += sys.getsizeof(node)
+        if isinstance(node.children, list): size += sys.getsizeof(node.children) + sys.getsizeof(node.keys)
+        p = node.payloads
+        if isinstance(p, list): size += sys.getsizeof(p) + sum(map(sys.getsizeof, p))
+        elif p is not None: size += sys.getsizeof(p)
+        stack.extend(child for _, child in node.items())
+    return nodes, size
+
+
+def contents(trie):
+    return {word: sorted(payloads) for word, payloads in trie.complete('', 10 ** 9)}
+
+
+def test_trie_matches_reference():
+    rnd = random.Random(0)
+    for _ in range(100):
+        trie, ref = DerivativeTrie(), {}
+        for _ in range(rnd.randint(1, 60)):
+            word = ''.join(rnd.choice('ابتث') for _ in range(rnd.randint(0, 5)))
+            payload = (rnd.choice('xyz'), rnd.choice('uv'))
+            if rnd.random() < 0.6:
+                trie.add(word, payload)
+                ref.setdefault(word, set()).add(payload)
+            else:
+                trie.remove(word, payload)
+                ref.get(word, set()).discard(payload)
+                if not ref.get(word, True): del ref[word]
+            stats = trie.stats()
+            assert (stats["nodes"], stats["bytes"]) == walk(trie)
+            assert stats["words"] == len(ref) and stats["payloads"] == sum(map(len, ref.values()))
+        assert contents(trie) == {word: sorted(payloads) for word, payloads in ref.items()}
+        assert [w for w, _ in trie.complete('', 10 ** 9)] == sorted(ref)
+        assert [w for w, _ in trie.complete('ب', 3)] == sorted(w for w in ref if w.startswith('ب'))[:3]
+        for query in ('', 'اب', 'ثثث'):
+            near = sorted((levenshtein(query, w), w) for w in ref if levenshtein(query, w) <= 1)
+            assert [(d, w) for d, w, _ in trie.search(query, 1)] == near
+
+
+@pytest.mark.parametrize('catchup', [logic_module.TRIE_CATCHUP_MAX, 0])
+def test_trie_built_outside_write_lock(open_store, monkeypatch, catchup):
+    # catchup=0 : modifications rejouées par lots sous verrou de lecture avant la mise en place
+    monkeypatch.setattr(logic_module, 'TRIE_CATCHUP_MAX', catchup)
+    logic, _ = open_store()
+    building, release, add_roots = threading.Event(), threading.Event(), logic._trie_add_roots
+
+    def slow_add_roots(trie, roots):
+        if not building.is_set():
+            building.set()
+            assert release.wait(5)
+        add_roots(trie, roots)
+    logic._trie_add_roots = slow_add_roots
+    suggest = threading.Thread(target=logic.suggest, args=('م',))
+    suggest.start()
+    assert building.wait(5)
+
+    def edits():
+        logic.add_root('نصر')
+        logic.remove_root('درس')
+        logic.add_scheme('مفعال', 'nom')
+        logic.delete_scheme('فاعل')
+        logic.add_root('شرب')
+        assert logic.identify_word('مشروب') == [{"root": 'شرب', "scheme": 'مفعول', "word": 'مشروب'}]
+    writer = threading.Thread(target=edits)
+    writer.start()
+    # Lectures et écritures passent pendant la construction
+    writer.join(5)
+    assert not writer.is_alive()
+    assert logic.trie is None
+    release.set()
+    suggest.join(5)
+
+    fresh = DerivativeTrie()
+    add_roots(fresh, list(logic.root_index))
+    assert logic.trie_pending is None
+    assert contents(logic.trie) == contents(fresh)
+    assert logic.trie.stats()["words"] == fresh.stats()["words"]
+    assert logic.trie.stats()["nodes"] == fresh.stats()["nodes"]
+    assert [r["word"] for r in logic.suggest('مشر')] == ['مشراب', 'مشروب']
@@ -0,0 +1,205 @@
+"""Trie des dérivés : chaque mot dérivable (racine x schème) avec ses analyses (racine, schème).
+
+Sert à la saisie semi-automatique (/suggest) : la recherche d'un préfixe ne coûte que sa longueur, puis
+on énumère au plus k complétions par ordre alphabétique (un mot avant ses prolongements).
+Sert aussi à la recherche approchée (/identify) : search() déroule la matrice de Levenshtein le long des
+branches et abandonne toute branche déjà à plus de k modifications.
+"""
+import sys
+from bisect import bisect_left
+
+
+class TrieNode:
+    # Comme Node : pas de __dict__. Lettres des enfants dans une chaîne triée ; un enfant unique (cas de la
+    # plupart des noeuds) est rangé tel quel avec sa lettre internée, plusieurs dans une liste parallèle aux
+    # lettres : 56 octets par noeud à un enfant au lieu de ~230 avec un dict. De même, une seule analyse est
+    # rangée telle quelle, une liste n'est créée qu'à partir de deux (mots ambigus).
+    __slots__ = ('keys', 'children', 'payloads')
+
+    def __init__(self, keys='', children=None):
+        self.keys = keys
+        self.children = children
+        self.payloads = None
+
+    def items(self):
+        c = self.children
+        if c.__class__ is list: return zip(self.keys, c)
+        return ((self.keys, c),) if c is not None else ()
+
+    def analyses(self):
+        p = self.payloads
+        return [] if p is None else list(p) if isinstance(p, list) else [p]
+
+
+class DerivativeTrie:
+    """Mots, analyses, noeuds et octets sont comptés au fil des ajouts et retraits : stats() ne parcourt rien."""
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.words = 0
+        self.payloads = 0
+        self.nodes = 1
+        # Octets des listes et chaînes d'enfants, puis des analyses (cf. NODE_BYTES pour les noeuds)
+        self.branch_bytes = 0
+        self.payload_bytes = 0
+
+    def add(self, word, payload):
+        node, depth = self.root, 0
+        for char in word:
+            i = node.keys.find(char)
+            if i < 0: break
+            c = node.children
+            node = c[i] if c.__class__ is list else c
+            depth += 1
+        if depth < len(word): node = self._add_branch(node, word, depth)
+        p = node.payloads
+        if p is None:
+            node.payloads = payload
+            self.words += 1
+        elif p == payload: return
+        elif isinstance(p, list):
+            if payload in p: return
+            self.payload_bytes -= sys.getsizeof(p)
+            p.append(payload)
+            self.payload_bytes += sys.getsizeof(p)
+        else:
+            node.payloads = [p, payload]
+            self.payload_bytes += sys.getsizeof(node.payloads)
+        self.payloads += 1
+        self.payload_bytes += sys.getsizeof(payload)
+
+    def _add_branch(self, node, word, depth):
+        """Prolonge node (le préfixe word[:depth]) par une chaîne de noeuds pour le reste de word ; renvoie le dernier."""
+        # Chaîne construite du bas vers le haut ; clés internées : une seule chaîne par lettre pour tous ses noeuds
+        last = child = TrieNode()
+        for char in reversed(word[depth + 1:]): child = TrieNode(sys.intern(char), child)
+        keys, children, char = node.keys, node.children, word[depth]
+        if not keys: node.keys, node.children = sys.intern(char), child
+        else:
+            i = bisect_left(keys, char)
+            node.keys = keys[:i] + char + keys[i:]
+            if len(keys) > 1:
+                # Liste agrandie en place (pas de copie à ramasser par le GC)
+                self.branch_bytes -= branch_bytes(keys, children)
+                children.insert(i, child)
+            else: node.children = [child, children] if i == 0 else [children, child]
+            self.branch_bytes += branch_bytes(node.keys, node.children)
+        self.nodes += len(word) - depth
+        return last
+
+    def remove(self, word, payload):
+        path, node = [], self.root
+        for char in word:
+            i = node.keys.find(char)
+            if i < 0: return
+            path.append(node)
+            c = node.children
+            node = c[i] if c.__class__ is list else c
+        p = node.payloads
+        if isinstance(p, list):
+            if payload not in p: return
+            self.payload_bytes -= sys.getsizeof(p) + sys.getsizeof(payload)
+            p.remove(payload)
+            if len(p) > 1: self.payload_bytes += sys.getsizeof(p)
+            else: node.payloads = p[0]
+            self.payloads -= 1
+            return
+        if p is None or p != payload: return
+        node.payloads = None
+        self.payload_bytes -= sys.getsizeof(p)
+        self.payloads -= 1
+        self.words -= 1
+        # On élague les noeuds devenus inutiles, de bas en haut
+        for parent, char in zip(reversed(path), reversed(word)):
+            if node.keys or node.payloads is not None: break
+            self._drop_child(parent, char)
+            node = parent
+
+    def _drop_child(self, node, char):
+        keys, children = node.keys, node.children
+        self.nodes -= 1
+        if len(keys) == 1:
+            node.keys, node.children = '', None
+            return
+        self.branch_bytes -= branch_bytes(keys, children)
+        i = keys.find(char)
+        keys = keys[:i] + keys[i + 1:]
+        del children[i]
+        if len(keys) == 1: node.keys, node.children = sys.intern(keys), children[0]
+        else:
+            node.keys = keys
+            self.branch_bytes += branch_bytes(keys, children)
+
+    def lookup(self, word):
+        node = self._find(word)
+        return node.analyses() if node else []
+
+    def complete(self, prefix, k=10):
+        """Au plus k mots commençant par prefix, avec leurs analyses, par ordre alphabétique."""
+        node = self._find(prefix)
+        if node is None: return []
+        res, stack = [], [(prefix, node)]
+        while stack and len(res) < k:
+            word, node = stack.pop()
+            if node.payloads is not None: res.append((word, node.analyses()))
+            # Lettres déjà triées, empilées à l'envers : la plus petite sort en premier
+            for char, child in reversed(list(node.items())): stack.append((word + char, child))
+        return res
+
+    def search(self, word, k=1):
+        """[(distance, mot, analyses)] des mots à distance d'édition <= k de word, du plus proche au plus éloigné."""
+        res, stack = [], [('', self.root, list(range(len(word) + 1)))]
+        while stack:
+            prefix, node, row = stack.pop()
+            if node.payloads is not None and row[-1] <= k: res.append((row[-1], prefix, node.analyses()))
+            for char, child in node.items():
+                new = edit_row(row, word, char)
+                # Même prolongée, cette branche ne peut plus descendre à k modifications
+                if min(new) <= k: stack.append((prefix + char, child, new))
+        res.sort(key=lambda r: r[:2])
+        return res
+
+    def _find(self, word):
+        node = self.root
+        for char in word:
+            i = node.keys.find(char)
+            if i < 0: return None
+            c = node.children
+            node = c[i] if c.__class__ is list else c
+        return node
+
+    def stats(self):
+        """Nombre de mots, d'analyses, de noeuds et mémoire occupée (octets, hors chaînes partagées avec l'arbre)."""
+        return {"words": self.words, "payloads": self.payloads, "nodes": self.nodes, "bytes": self.bytes()}
+
+    def bytes(self):
+        return self.nodes * NODE_BYTES + self.branch_bytes + self.payload_bytes
+
+
+# Mémoire comptée : noeuds, listes et chaînes d'enfants des noeuds qui en ont plusieurs, analyses ; ni les
+# lettres internées, ni les racines et noms de schèmes (chaînes partagées avec l'arbre et les schèmes)
+NODE_BYTES = sys.getsizeof(TrieNode())
+LETTER_BYTES = sys.getsizeof('\u0628\u0628') - sys.getsizeof('\u0628')
+STR_BYTES = sys.getsizeof('\u0628') - LETTER_BYTES
+
+
+def branch_bytes(keys, children):
+    # Lettres arabes : deux octets par lettre (sys.getsizeof sans l'appel)
+    return sys.getsizeof(children) + STR_BYTES + LETTER_BYTES * len(keys)
+
+
+def edit_row(row, word, char, wildcard=None):
+    """Ligne suivante de la matrice de Levenshtein entre word et un préfixe prolongé de char.
+
+    Une lettre wildcard de word s'accorde avec n'importe quelle lettre, sans modification.
+    """
+    new = [row[0] + 1]
+    for i, c in enumerate(word):
+        new.append(min(new[i] + 1, row[i + 1] + 1, row[i] + (c != char and c != wildcard)))
+    return new
+
+
+def levenshtein(a, b):
+    row = list(range(len(a) + 1))
+    for char in b: row = edit_row(row, a, char)
+    return row[-1]
@@ -0,0 +1,44 @@
+"""Moteur de dérivation vectorisé (NumPy) : toutes les racines x tous les schèmes en une seule opération de tableau.
+
+Les racines sont codées en tableau (n, 3) de points de code. Chaque schème est compilé une fois en gabarit
+d'indices : 0, 1, 2 pour ف, ع, ل, puis les colonnes des lettres fixes, et -1 (colonne de zéros) pour compléter
+les schèmes plus courts. Un seul indexage avancé produit la matrice des dérivés, qui n'est décodée en chaînes
+qu'à la sortie (les chaînes numpy '<U' ignorent les zéros de fin).
+
+Seuls les gabarits réguliers des racines trilitères sont vectorisés : les racines quadrilitères, et les racines
+faibles pour les schèmes soumis à une règle, passent par l'automate (morphology.py).
+"""
+try:
+    import numpy as np
+except ImportError: # Moteur optionnel : SARF_Logic retombe sur apply_scheme
+    np = None
+
+SLOTS = {'ف': 0, 'ع': 1, 'ل': 2}
+
+
+def encode(words, length):
+    """Mots de même longueur -> tableau (n, length) de points de code (uint32)."""
+    return np.array(words, dtype=f'<U{length}').view(np.uint32).reshape(len(words), length)
+
+
+class DerivationEngine:
+    def __init__(self, schemes):
+        self.schemes = list(schemes)
+        self.width = max(map(len, self.schemes), default=0)
+        columns, gather = {}, []
+        for s_name in self.schemes:
+            # Une colonne par lettre fixe distincte, partagée entre schèmes
+            idx = [SLOTS[c] if c in SLOTS else 3 + columns.setdefault(c, len(columns)) for c in s_name]
+            gather.append(idx + [-1] * (self.width - len(idx)))
+        self.fixed = np.array([ord(c) for c in columns] + [0], dtype=np.uint32)
+        self.gather = np.array(gather, dtype=np.intp).reshape(len(self.schemes), self.width)
+
+    def derive(self, roots):
+        """Liste de racines -> pour chaque racine, la liste des dérivés dans l'ordre de self.schemes."""
+        if not self.schemes or not roots: return [[] for _ in roots]
+        codes = encode(roots, 3)
+        ext = np.concatenate([codes, np.broadcast_to(self.fixed, (len(codes), len(self.fixed)))], axis=1)
+        # (racines, schèmes, largeur) : take renvoie un tableau contigu, vu directement comme chaînes
+        words = np.take(ext, self.gather, axis=1)
+        return words.view(f'<U{self.width}').reshape(len(codes), len(self.schemes)).tolist()
+